@@ -1,22 +1,91 @@
 import json
 import os
+import threading
+import time
 import uuid
+from http.cookiejar import DefaultCookiePolicy
 from urllib.parse import urlencode
 
 import requests
 from django.conf import settings
 from django.urls import reverse
 from oic import rndstr
-from oic.oauth2 import AuthorizationResponse
+from oic.oauth2 import AuthorizationResponse, base as oauth2_base
 from oic.oic import Client
 from oic.utils.authn.client import ClientSecretBasic, ClientSecretPost
 
 
+_session = None
+_session_lock = threading.Lock()
+
+_provider_configs = {}
+_provider_config_lock = threading.Lock()
+
+
+def get_session():
+    """Process-wide session, so requests to AuthMachine reuse keep-alive connections"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                # the session is shared by all users, pyoidc keeps the cookies of every client itself
+                session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+                _session = session
+    return _session
+
+
+class SessionTransport(object):
+    """Stands in for the requests module of pyoidc, so its requests go through the shared session"""
+
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+    @staticmethod
+    def request(method, url, **kwargs):
+        return get_session().request(method, url, **kwargs)
+
+
+# PBase.http_request keeps handling cookies, verify_ssl and client_cert, only the transport is replaced
+oauth2_base.requests = SessionTransport()
+
+
+def get_provider_config(client):
+    """Provider configuration and keys of AuthMachine, discovered at most once per AUTHMACHINE_PROVIDER_CONFIG_TTL.
+
+    When a refresh fails the previous configuration is used until the next attempt.
+    """
+    issuer = settings.AUTHMACHINE_URL
+    with _provider_config_lock:
+        config = _provider_configs.get(issuer)
+        if config is None or config["expires_at"] <= time.monotonic():
+            try:
+                pcr = client.provider_config(issuer)
+            except Exception as e:
+                if config is None:
+                    raise
+                print("Failed to refresh AuthMachine provider config:", e, flush=True)
+                config["expires_at"] = time.monotonic() + settings.AUTHMACHINE_PROVIDER_CONFIG_RETRY
+            else:
+                config = dict(
+                    pcr=pcr,
+                    keyjar=client.keyjar,
+                    expires_at=time.monotonic() + settings.AUTHMACHINE_PROVIDER_CONFIG_TTL,
+                )
+                _provider_configs[issuer] = config
+        return config
+
+
+def clear_provider_config():
+    with _provider_config_lock:
+        _provider_configs.clear()
+
+
 class OICClient(Client):
-    def http_request(self, *args, **kwargs):
+    def http_request(self, url, method="GET", **kwargs):
         # Set requests timeout for all http connections pyoidc makes
-        kwargs["timeout"] = 20
-        return super(Client, self).http_request(*args, **kwargs)
+        kwargs["timeout"] = settings.AUTHMACHINE_TIMEOUT
+        return super().http_request(url, method, **kwargs)
 
 
 class AuthMachineClient(object):
@@ -36,7 +105,9 @@ class AuthMachineClient(object):
             'client_secret_post': ClientSecretPost,
             'client_secret_basic': ClientSecretBasic
         })
-        client.provider_config(settings.AUTHMACHINE_URL)
+        config = get_provider_config(client)
+        client.keyjar = config["keyjar"]
+        client.handle_provider_config(config["pcr"], settings.AUTHMACHINE_URL, keys=False)
         client.client_id = settings.AUTHMACHINE_CLIENT_ID
         client.client_secret = settings.AUTHMACHINE_CLIENT_SECRET
         client.verify_ssl = True
@@ -135,7 +206,8 @@ class AuthMachineClient(object):
         headers = kwargs.pop('headers', {})
         headers['Content-Type'] = 'application/json'
         headers['Authorization'] = 'Token %s' % settings.AUTHMACHINE_API_TOKEN
-        response = requests.request(method=method, url=absolute_url, headers=headers, **kwargs)
+        kwargs.setdefault('timeout', settings.AUTHMACHINE_TIMEOUT)
+        response = get_session().request(method=method, url=absolute_url, headers=headers, **kwargs)
 
         return response
 
@@ -157,9 +229,10 @@ class AuthMachineClient(object):
             'access_token': token['access_token'],
             'grant_type': 'check_token_revoked',
         }
-        response = requests.request(method="POST",
-                                    url=os.path.join(settings.AUTHMACHINE_URL, "oidc/token"),
-                                    data=args)
+        response = get_session().request(method="POST",
+                                         url=os.path.join(settings.AUTHMACHINE_URL, "oidc/token"),
+                                         data=args,
+                                         timeout=settings.AUTHMACHINE_TIMEOUT)
 
         if response.status_code == 200:
             data = response.json()
@@ -0,0 +1,107 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class StubAuthMachineHandler(BaseHTTPRequestHandler):
+    # keep-alive, so connection reuse by the client can be observed
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.stub.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.handle_request("GET")
+
+    def do_POST(self):
+        self.handle_request("POST")
+
+    def handle_request(self, method):
+        stub = self.server.stub
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        data = parse_qs(self.rfile.read(length).decode()) if length else {}
+        stub.requests.append((method, url.path))
+
+        status, body = stub.get_response(method, url.path, data)
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in stub.headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class StubAuthMachine:
+    """AuthMachine serving discovery, token, userinfo and permission endpoints on a local port.
+
+    Every request is recorded in requests as (method, path) and every new TCP connection is counted,
+    so tests can check how many round-trips a flow makes. Use it as a context manager together with
+    override_settings(AUTHMACHINE_URL=stub.url).
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.connections = 0
+        self.userinfo = {"sub": "1", "id": "1", "email": "person@example.com"}
+        self.permissions = {"is_superuser": False, "permissions": {}}
+        self.revoked = False
+        # extra headers of every response
+        self.headers = {}
+        # every endpoint answers 503 while the stub is unavailable
+        self.available = True
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubAuthMachineHandler)
+        self.server.daemon_threads = True
+        self.server.stub = self
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = None
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, path):
+        return sum(1 for _, request_path in self.requests if request_path == path)
+
+    def get_provider_config(self):
+        return {
+            "issuer": self.url,
+            "authorization_endpoint": f"{self.url}/oidc/authorize",
+            "registration_endpoint": f"{self.url}/oidc/register",
+            "token_endpoint": f"{self.url}/oidc/token",
+            "userinfo_endpoint": f"{self.url}/oidc/userinfo",
+            "end_session_endpoint": f"{self.url}/oidc/logout",
+            "jwks_uri": f"{self.url}/oidc/jwks",
+            "response_types_supported": ["code"],
+            "subject_types_supported": ["public"],
+            "id_token_signing_alg_values_supported": ["RS256"],
+        }
+
+    def get_response(self, method, path, data):
+        if not self.available:
+            return 503, {"detail": "Service unavailable"}
+        if path == "/.well-known/openid-configuration":
+            return 200, self.get_provider_config()
+        if path == "/oidc/jwks":
+            return 200, {"keys": []}
+        if path == "/oidc/token":
+            if data.get("grant_type") == ["check_token_revoked"]:
+                return 200, {"revoked": self.revoked}
+            return 200, {"access_token": "access-token", "token_type": "Bearer", "expires_in": 3600}
+        if path == "/oidc/userinfo":
+            return 200, self.userinfo
+        if path.startswith("/api/scim/v1/Users/") and path.endswith("/permissions"):
+            return 200, self.permissions
+        return 404, {"detail": "Not found"}
@@ -0,0 +1,91 @@
+from unittest import mock
+
+from django.conf import settings
+from django.test import RequestFactory, override_settings
+
+from api.auth.authmachine_client import AuthMachineClient, OICClient, clear_provider_config, get_session
+from api.auth.stub_server import StubAuthMachine
+from backend.test_base import TestCase
+
+
+class AuthMachineClientTest(TestCase):
+    def setUp(self):
+        self.stub = StubAuthMachine().__enter__()
+        self.addCleanup(self.stub.__exit__)
+        clear_provider_config()
+        self.addCleanup(clear_provider_config)
+
+        settings_override = override_settings(AUTHMACHINE_URL=self.stub.url, AUTHMACHINE_CLIENT_ID="client-id",
+                                              AUTHMACHINE_CLIENT_SECRET="client-secret",
+                                              AUTHMACHINE_API_TOKEN="api-token", AUTHMACHINE_PROVIDER_CONFIG_TTL=60)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def login(self):
+        request = RequestFactory().get("/oidc/callback", {"code": "code", "state": "state"})
+        client = AuthMachineClient(request)
+        authorization_response = client.get_authorization_response()
+        client.get_access_token(authorization_response)
+        user_info = client.get_userinfo(authorization_response)
+        client.get_permissions(user_info["id"], ["product"])
+        return user_info
+
+    def test_login_path(self):
+        self.assertEqual(self.login()["email"], "person@example.com")
+        self.login()
+
+        self.assertEqual(self.stub.requests, [
+            ("GET", "/.well-known/openid-configuration"),
+            ("POST", "/oidc/token"),
+            ("POST", "/oidc/userinfo"),
+            ("GET", "/api/scim/v1/Users/1/permissions"),
+            ("POST", "/oidc/token"),
+            ("POST", "/oidc/userinfo"),
+            ("GET", "/api/scim/v1/Users/1/permissions"),
+        ])
+        # every request reuses the same keep-alive connection
+        self.assertEqual(self.stub.connections, 1)
+
+    def test_pyoidc_request_options(self):
+        client = OICClient()
+        client.request_args.update(verify=False, cert="client.pem")
+        response = mock.Mock(headers={"set-cookie": "sid=1; Path=/"})
+        with mock.patch.object(get_session(), "request", return_value=response) as request:
+            client.http_request(f"{self.stub.url}/oidc/userinfo")
+            client.http_request(f"{self.stub.url}/oidc/userinfo")
+
+        request.assert_called_with("GET", f"{self.stub.url}/oidc/userinfo", allow_redirects=False, cert="client.pem",
+                                   verify=False, timeout=settings.AUTHMACHINE_TIMEOUT, cookies={"sid": "1"})
+
+    def test_shared_session_keeps_no_cookies(self):
+        self.stub.headers = {"Set-Cookie": "sid=1; Path=/"}
+        client = AuthMachineClient(RequestFactory().get("/"))
+
+        self.assertEqual(client.client._cookies(), {"sid": "1"})
+        self.assertEqual(len(get_session().cookies), 0)
+
+    def test_provider_config_ttl(self):
+        request = RequestFactory().get("/")
+        with mock.patch("api.auth.authmachine_client.time.monotonic", return_value=1000):
+            AuthMachineClient(request)
+            url = AuthMachineClient(request).get_logout_url()
+        self.assertTrue(url.startswith(f"{self.stub.url}/oidc/logout?"))
+        self.assertEqual(self.stub.count("/.well-known/openid-configuration"), 1)
+
+        with mock.patch("api.auth.authmachine_client.time.monotonic", return_value=1061):
+            AuthMachineClient(request)
+        self.assertEqual(self.stub.count("/.well-known/openid-configuration"), 2)
+
+    def test_stale_provider_config_on_failure(self):
+        request = RequestFactory().get("/")
+        with mock.patch("api.auth.authmachine_client.time.monotonic", return_value=1000):
+            AuthMachineClient(request)
+
+        self.stub.available = False
+        with mock.patch("api.auth.authmachine_client.time.monotonic", return_value=2000):
+            client = AuthMachineClient(request)
+        self.assertEqual(client.client.provider_info["token_endpoint"], f"{self.stub.url}/oidc/token")
+
+    def test_check_token_revoked_status(self):
+        client = AuthMachineClient(RequestFactory().get("/"))
+        self.assertEqual(client.check_token_revoked_status({"access_token": "token"}), {"revoked": False})
@@ -0,0 +1,279 @@
+import difflib
+import json
+import math
+import os
+import random
+import re
+import time
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from comments.models import TaskComment
+from commercial.models import ProductOwner
+from ideas_bugs.models import Bug, Idea
+from matching.models import CLAIM_TYPE_ACTIVE, CLAIM_TYPE_DONE, TaskClaim
+from talent.models import Person
+from users.models import User
+from work.models import Capability, Product, ProductTask, Tag, Task, TaskCounter, TaskDepend, TaskListingQueue
+from work.services import rebuild_all_task_listings
+
+QUERY_BUDGETS_FILE = os.path.join(os.path.dirname(__file__), "query_budgets.json")
+
+TASK_LISTING_FIELDS = """
+    id title status priority tags category expertise inReview blocked publishedId
+    product { name slug owner } initiative { id name }
+    assignedToPerson { firstName slug } reviewer { username firstName }
+"""
+
+# the frontend's main reads, GraphQL operations are posted to /graphql, paths are fetched with GET.
+# Callable variables are evaluated once before the operation is replayed.
+OPERATIONS = [
+    dict(name="tasklisting", query=f"""
+        query Tasklisting($input: TaskListInput) {{ tasklisting(input: $input) {{ {TASK_LISTING_FIELDS} }} }}
+    """, variables={"input": {"sortedBy": "priority", "statuses": [2, 3]}}),
+    dict(name="tasklisting_by_product", query=f"""
+        query TasklistingByProduct($productSlug: String, $input: TaskListInput) {{
+            tasklistingByProduct(productSlug: $productSlug, input: $input) {{ {TASK_LISTING_FIELDS} }}
+            tasklistingByProductCount(productSlug: $productSlug, input: $input)
+        }}
+    """, variables={"productSlug": "benchmark0", "input": {"sortedBy": "priority"}}),
+    dict(name="product", query="""
+        query Product($slug: String) {
+            product(slug: $slug) { id name slug website owner availableTaskNum totalTaskNum initiativeSet { id name } }
+        }
+    """, variables={"slug": "benchmark0"}),
+    dict(name="products", query="""
+        query Products { products { id name slug owner availableTaskNum totalTaskNum } }
+    """),
+    dict(name="capabilities", query="""
+        query Capabilities($productSlug: String) { capabilitiesAsList(productSlug: $productSlug) { id name } }
+    """, variables={"productSlug": "benchmark0"}),
+    dict(name="capability_tree", path="/capabilities/benchmark0"),
+    dict(name="person_info", query="""
+        query PersonInfo($personSlug: String) { personInfo(personSlug: $personSlug) { id firstName slug avatar } }
+    """, variables={"personSlug": "benchmark0"}),
+    dict(name="task", query="""
+        query Task($publishedId: Int, $productSlug: String) {
+            task(publishedId: $publishedId, productSlug: $productSlug) {
+                id title status dependOn { id title } relatives { id title }
+            }
+        }
+    """, variables=lambda: {"publishedId": get_published_id("benchmark0"), "productSlug": "benchmark0"}),
+    dict(name="task_comments", query="""
+        query TaskComments($objectId: Int) { taskComments(objectId: $objectId) }
+    """, variables=lambda: {"objectId": get_commented_task_id()}),
+    dict(name="bugs", query="""
+        query Bugs($productSlug: String) { bugs(productSlug: $productSlug) { id headline description voteUp } }
+    """, variables={"productSlug": "benchmark0"}),
+    dict(name="ideas", query="""
+        query Ideas($productSlug: String) { ideas(productSlug: $productSlug) { id headline description voteUp } }
+    """, variables={"productSlug": "benchmark0"}),
+]
+
+
+def get_published_id(product_slug):
+    return Task.objects.filter(producttask__product__slug=product_slug).order_by("published_id") \
+        .values_list("published_id", flat=True).first()
+
+
+def get_commented_task_id():
+    return Task.objects.filter(comments_start__isnull=False).order_by("id").values_list("id", flat=True).first()
+
+
+def create_capabilities(product, levels=(4, 3, 2)):
+    root = Capability.add_root(name=product.name)
+    Product.objects.filter(pk=product.pk).update(capability_start=root)
+
+    capabilities = []
+    parents = [root]
+    for width in levels:
+        children = []
+        for parent in parents:
+            for i in range(width):
+                parent = Capability.objects.get(pk=parent.pk)
+                children.append(parent.add_child(name=f"{parent.name} {i}", description=f"Capability {i}"))
+        capabilities += children
+        parents = children
+    return capabilities
+
+
+def create_comments(rng, persons, task, count):
+    root = TaskComment.add_root(text="root")
+    Task.objects.filter(pk=task.pk).update(comments_start=root)
+
+    comments = [root]
+    for i in range(count):
+        parent = TaskComment.objects.get(pk=rng.choice(comments[-5:]).pk)
+        if parent.depth >= 4:
+            parent = TaskComment.objects.get(pk=root.pk)
+        comments.append(parent.add_child(text=f"Comment {i}", person=rng.choice(persons)))
+
+
+def seed_benchmark_data(products=3, tasks=100, persons=20, seed=0):
+    """Synthetic dataset for the benchmark: products with capability trees, ideas and bugs, and tasks with
+    tags, claims, dependencies and comment trees. The same arguments always produce the same data."""
+    rng = random.Random(seed)
+
+    people = []
+    for i in range(persons):
+        user = User.objects.create(username=f"benchmark{i}", email=f"benchmark{i}@example.com")
+        people.append(Person.objects.create(first_name=f"Person {i}", slug=f"benchmark{i}", headline="",
+                                            email_address=user.email, user=user))
+
+    tags = [Tag.objects.create(name=f"tag{i}") for i in range(10)]
+    statuses = [Task.TASK_STATUS_AVAILABLE, Task.TASK_STATUS_AVAILABLE, Task.TASK_STATUS_CLAIMED,
+                Task.TASK_STATUS_DONE, Task.TASK_STATUS_BLOCKED]
+
+    for i in range(products):
+        owner = ProductOwner.objects.create(person=people[i % persons])
+        product = Product.objects.create(name=f"benchmark{i}", short_description=f"Product {i}",
+                                         website="https://example.com", owner=owner)
+        capabilities = create_capabilities(product)
+
+        for j in range(10):
+            Idea.objects.create(person=rng.choice(people), product=product, headline=f"Idea {j}",
+                                description="", related_capability=rng.choice(capabilities))
+            Bug.objects.create(person=rng.choice(people), product=product, headline=f"Bug {j}",
+                               description="", related_capability=rng.choice(capabilities))
+
+        product_tasks = []
+        for j in range(tasks):
+            status = rng.choice(statuses)
+            creator = rng.choice(people)
+            task = Task.objects.create(
+                title=f"Task {j}", description=f"Task {j} of {product.name}", short_description=f"Task {j}",
+                status=Task.TASK_STATUS_AVAILABLE, priority=rng.randrange(3), capability=rng.choice(capabilities),
+                product=product, created_by=creator, updated_by=creator, reviewer=rng.choice(people),
+            )
+            ProductTask.objects.create(product=product, task=task)
+            # the status signals (e.g. the email to the reviewer) need the ProductTask
+            if status != task.status:
+                task.status = status
+                task.save()
+            task.tag.add(*rng.sample(tags, rng.randrange(4)))
+
+            if task.status in (Task.TASK_STATUS_CLAIMED, Task.TASK_STATUS_DONE):
+                kind = CLAIM_TYPE_ACTIVE if task.status == Task.TASK_STATUS_CLAIMED else CLAIM_TYPE_DONE
+                TaskClaim.objects.create(task=task, person=rng.choice(people), kind=kind)
+            if product_tasks and rng.random() < 0.3:
+                for depends_by in rng.sample(product_tasks, min(len(product_tasks), rng.randrange(1, 4))):
+                    TaskDepend.objects.create(task=task, depends_by=depends_by)
+            if rng.random() < 0.2:
+                create_comments(rng, people, task, rng.randrange(1, 30))
+            product_tasks.append(task)
+
+    rebuild_all_task_listings()
+    TaskListingQueue.objects.all().delete()
+    TaskCounter.reconcile()
+
+
+def get_percentile(values, percentile):
+    values = sorted(values)
+    return values[max(math.ceil(percentile / 100 * len(values)) - 1, 0)]
+
+
+def get_variables(operation):
+    variables = operation.get("variables") or {}
+    return variables() if callable(variables) else variables
+
+
+def run_operation(client, operation, variables):
+    if "path" in operation:
+        return client.get(operation["path"])
+
+    body = dict(query=operation["query"], variables=variables)
+    return client.post("/graphql", json.dumps(body), content_type="application/json")
+
+
+def check_response(operation, response):
+    errors = None
+    if "query" in operation and response.status_code == 200:
+        errors = response.json().get("errors")
+    if response.status_code != 200 or errors:
+        raise Exception(f"{operation['name']} failed with {response.status_code}: {errors or response.content[:500]}")
+
+
+def run_benchmark(operations=None, iterations=20, warmup=2):
+    """p50/p95 latency (ms) and query count of every operation replayed through the test client"""
+    client = Client()
+    results = {}
+    for operation in operations or OPERATIONS:
+        variables = get_variables(operation)
+        timings = []
+        queries = 0
+        for i in range(warmup + iterations):
+            with CaptureQueriesContext(connection) as context:
+                started_at = time.perf_counter()
+                response = run_operation(client, operation, variables)
+                duration = time.perf_counter() - started_at
+
+            check_response(operation, response)
+            if i >= warmup:
+                timings.append(duration * 1000)
+                queries = max(queries, len(context.captured_queries))
+
+        results[operation["name"]] = dict(
+            p50_ms=round(get_percentile(timings, 50), 2),
+            p95_ms=round(get_percentile(timings, 95), 2),
+            queries=queries,
+        )
+    return results
+
+
+def compare_with_baseline(results, baseline, tolerance=0.2):
+    """Regression messages of results against the baseline: more queries or a p95 more than tolerance slower"""
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if not expected:
+            continue
+        if result["queries"] > expected["queries"]:
+            regressions.append(f"{name}: {result['queries']} queries, baseline {expected['queries']}")
+        if result["p95_ms"] > expected["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {result['p95_ms']} ms, baseline {expected['p95_ms']} ms")
+    return regressions
+
+
+def normalize_sql(sql):
+    """SQL with its literals and savepoint names replaced, so the statements of two runs can be compared"""
+    sql = re.sub(r"'(?:[^']|'')*'", "%s", sql)
+    sql = re.sub(r'"s\d+_x\d+"', '"savepoint"', sql)
+    sql = re.sub(r"\b\d+(?:\.\d+)?\b", "%s", sql)
+    return re.sub(r"\((?:%s, )+%s\)", "(%s, ...)", sql)
+
+
+def capture_queries(client, operation):
+    """Normalized SQL statements of one replay of the operation"""
+    variables = get_variables(operation)
+    with CaptureQueriesContext(connection) as context:
+        response = run_operation(client, operation, variables)
+
+    check_response(operation, response)
+    return [normalize_sql(query["sql"]) for query in context.captured_queries]
+
+
+def load_query_budgets(path=QUERY_BUDGETS_FILE):
+    with open(path) as f:
+        return json.load(f)
+
+
+def store_query_budgets(budgets, path=QUERY_BUDGETS_FILE):
+    with open(path, "w") as f:
+        json.dump(budgets, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def get_query_budget(statements):
+    return dict(max_queries=len(statements), queries=statements)
+
+
+def check_query_budget(name, statements, budget):
+    """Error message with a diff against the recorded statements when the operation ran more queries
+    than its budget allows, None otherwise"""
+    if len(statements) <= budget["max_queries"]:
+        return None
+
+    diff = difflib.unified_diff(budget.get("queries", []), statements, "budget", "current", lineterm="", n=1)
+    return f"{name} ran {len(statements)} queries, its budget is {budget['max_queries']}:\n" + "\n".join(diff)
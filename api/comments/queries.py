@@ -1,17 +1,32 @@
 import graphene
 from graphene import ObjectType
-from api.comments.utils import resolve_comments
+from api.comments.types import CommentConnection
+from api.comments.utils import resolve_comments, get_comment_thread
 from comments.models import TaskComment, IdeaComment, BugComment, CapabilityComment
 from ideas_bugs.models import Idea, Bug
 from work.models import Task, Capability
 
 
+def comment_thread_field():
+    return graphene.relay.ConnectionField(
+        CommentConnection,
+        object_id=graphene.Int(required=True),
+        parent_id=graphene.Int(required=False),
+        max_depth=graphene.Int(required=False)
+    )
+
+
 class CommentsQuery(ObjectType):
     task_comments = graphene.JSONString(object_id=graphene.Int())
     idea_comments = graphene.JSONString(object_id=graphene.Int())
     bug_comments = graphene.JSONString(object_id=graphene.Int())
     capability_comments = graphene.JSONString(object_id=graphene.Int())
 
+    task_comment_thread = comment_thread_field()
+    idea_comment_thread = comment_thread_field()
+    bug_comment_thread = comment_thread_field()
+    capability_comment_thread = comment_thread_field()
+
     @staticmethod
     def resolve_task_comments(*args, **kwargs):
         return resolve_comments(kwargs.get("object_id"), Task, TaskComment)
@@ -27,3 +42,19 @@ class CommentsQuery(ObjectType):
     @staticmethod
     def resolve_capability_comments(*args, **kwargs):
         return resolve_comments(kwargs.get("object_id"), Capability, CapabilityComment)
+
+    @staticmethod
+    def resolve_task_comment_thread(*args, **kwargs):
+        return get_comment_thread(kwargs.get("object_id"), Task, TaskComment, kwargs)
+
+    @staticmethod
+    def resolve_idea_comment_thread(*args, **kwargs):
+        return get_comment_thread(kwargs.get("object_id"), Idea, IdeaComment, kwargs)
+
+    @staticmethod
+    def resolve_bug_comment_thread(*args, **kwargs):
+        return get_comment_thread(kwargs.get("object_id"), Bug, BugComment, kwargs)
+
+    @staticmethod
+    def resolve_capability_comment_thread(*args, **kwargs):
+        return get_comment_thread(kwargs.get("object_id"), Capability, CapabilityComment, kwargs)
@@ -0,0 +1,39 @@
+import graphene
+from api.pagination import CountableConnection
+
+
+class CommentAuthorType(graphene.ObjectType):
+    first_name = graphene.String()
+    slug = graphene.String()
+
+    def resolve_first_name(self, _):
+        return self["firstName"]
+
+    def resolve_slug(self, _):
+        return self["slug"]
+
+
+class CommentType(graphene.ObjectType):
+    id = graphene.Int()
+    text = graphene.String()
+    person = graphene.Field(CommentAuthorType)
+    depth = graphene.Int(description="1 for top-level comments")
+    child_count = graphene.Int()
+    replies = graphene.List(lambda: CommentType, description="Replies down to the requested max depth")
+
+    def resolve_person(self, _):
+        return getattr(self, "author", None)
+
+    def resolve_depth(self, _):
+        return self.depth - 1
+
+    def resolve_child_count(self, _):
+        return self.numchild
+
+    def resolve_replies(self, _):
+        return getattr(self, "replies", [])
+
+
+class CommentConnection(CountableConnection):
+    class Meta:
+        node = CommentType
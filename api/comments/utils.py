@@ -1,5 +1,10 @@
 import re
-from backend.utils import send_email
+from django.conf import settings
+from django.db.models import Q, Subquery
+from treebeard.exceptions import PathOverflow
+from api.comments.types import CommentConnection
+from api.pagination import paginate_keyset
+from comments.services import queue_mention_emails
 from talent.models import Person
 
 
@@ -23,40 +28,136 @@ def create_comment(current_person, comment_input, commented_object, comment_obje
         parent_node.add_child(text=comment_input.text,
                               person_id=current_person.id)
 
-        mentioned_slugs = re.findall("@([\S]+)", comment_input.text)
-        mentioned_emails = list(Person.objects.filter(user__username__in=mentioned_slugs)
-                                .distinct()
-                                .values_list("email_address", flat=True))
+        mentioned_slugs = set(re.findall("@([\S]+)", comment_input.text))
+        if mentioned_slugs:
+            queue_mention_emails(current_person, comment_input.text, mentioned_slugs)
 
-        send_email(
-            to_emails=mentioned_emails,
-            subject='You have been mentioned in the comment',
-            content=comment_input.text
-        )
         return True, "Comment was successfully created"
     except commented_object.DoesNotExist:
         return False, "Commented object doesn't exist"
 
 
-def resolve_comments(commented_object_id, commented_object, comment_object):
+def get_comments_root(commented_object_id, commented_object, comment_object):
+    """The root comment of the commented object, None when nobody has commented yet"""
+    return comment_object.objects.filter(
+        pk=Subquery(commented_object.objects.filter(pk=commented_object_id).values("comments_start_id"))
+    ).first()
+
+
+def get_descendants_filter(node, last=None):
+    """Descendants of a treebeard MP_Node as a path range, an index range scan whatever the collation.
+
+    With last, a later sibling of node, the range runs to the end of the subtree of last and also holds the siblings
+    in between.
+    """
+    last = last or node
     try:
-        node_id = commented_object.objects.get(pk=commented_object_id).comments_start_id
+        return Q(path__gt=node.path, path__lt=last._inc_path())
+    except PathOverflow:
+        # last is the final possible sibling, nothing after its subtree shares their parent's path
+        return Q(path__gt=node.path, path__startswith=last.path[:-last.steplen])
+
+
+def get_comment_authors(person_ids):
+    """person id -> author data of the comments, one query for all of them"""
+    persons = Person.objects.select_related("user").in_bulk(set(person_id for person_id in person_ids if person_id))
+    return {
+        person_id: {'firstName': person.first_name, 'slug': person.user.username}
+        for person_id, person in persons.items()
+    }
 
-        tree = comment_object.dump_bulk(parent=comment_object.objects.get(pk=node_id))
-        tree = tree[0]['children']
-        list(map(lambda comment: fetch_tree(comment), tree))
 
-        return tree
-    except:
+def resolve_comments(commented_object_id, commented_object, comment_object):
+    """The whole comment thread of the object as nested dicts, the comments and their authors take two queries"""
+    root = get_comments_root(commented_object_id, commented_object, comment_object)
+    if not root:
         return None
 
+    comments = list(
+        comment_object.objects
+        .filter(get_descendants_filter(root))
+        .order_by("path")
+        .values("id", "path", "person_id", "text")
+    )
+    if not comments:
+        return None
 
-def fetch_tree(comment):
-    try:
-        person = Person.objects.get(pk=comment['data']['person'])
-        comment['data']['person'] = {'firstName': person.first_name, 'slug': person.user.username}
+    authors = get_comment_authors(comment["person_id"] for comment in comments)
+    steplen = comment_object.steplen
+
+    tree = []
+    nodes = {}
+    for comment in comments:
+        node = {
+            'data': {'person': authors.get(comment["person_id"]), 'text': comment["text"]},
+            'id': comment["id"],
+        }
+        nodes[comment["path"]] = node
+
+        # ordered by path, so the parent is always there already
+        parent = nodes.get(comment["path"][:-steplen])
+        if parent:
+            parent.setdefault('children', []).append(node)
+        else:
+            tree.append(node)
+
+    return tree
+
+
+def get_comment_thread(commented_object_id, commented_object, comment_object, kwargs):
+    """One page of the replies to parent_id (top-level comments without it) as a connection.
+
+    Pages are keyset ranges over path within one depth, so every page is an index range scan. Up to
+    max_depth levels of replies of the page are added in one more query, deeper replies are loaded by
+    asking again with their parent_id, child_count tells whether there are any.
+    """
+    root = get_comments_root(commented_object_id, commented_object, comment_object)
+    if not root:
+        return paginate_keyset(comment_object.objects.none(), CommentConnection, sorted_by="path", first=0)
+
+    parent = root
+    parent_id = kwargs.get("parent_id")
+    if parent_id is not None:
+        parent = comment_object.objects.filter(get_descendants_filter(root), pk=parent_id).first()
+        if not parent:
+            raise Exception("Comment doesn't exist")
+
+    connection = paginate_keyset(
+        comment_object.objects.filter(get_descendants_filter(parent), depth=parent.depth + 1),
+        CommentConnection,
+        sorted_by="path",
+        first=kwargs.get("first"),
+        after=kwargs.get("after"),
+        last=kwargs.get("last"),
+        before=kwargs.get("before"),
+    )
+
+    comments = [edge.node for edge in connection.edges]
+    if not comments:
+        return connection
+
+    for comment in comments:
+        comment.replies = []
+
+    max_depth = min(kwargs.get("max_depth") or 1, settings.COMMENT_THREAD_MAX_DEPTH)
+    replies = []
+    if max_depth > 1:
+        # the page is a run of siblings, so all their subtrees lie between the first and the next after the last
+        replies = list(
+            comment_object.objects
+            .filter(get_descendants_filter(comments[0], comments[-1]),
+                    depth__gt=parent.depth + 1, depth__lte=parent.depth + max_depth)
+            .order_by("path")
+        )
+
+    comments_by_path = {comment.path: comment for comment in comments}
+    for reply in replies:
+        reply.replies = []
+        comments_by_path[reply.path] = reply
+        comments_by_path[reply.path[:-comment_object.steplen]].replies.append(reply)
+
+    authors = get_comment_authors(comment.person_id for comment in comments_by_path.values())
+    for comment in comments_by_path.values():
+        comment.author = authors.get(comment.person_id)
 
-        if comment['children']:
-            list(map(lambda children: fetch_tree(children), comment['children']))
-    except:
-        pass
\ No newline at end of file
+    return connection
@@ -0,0 +1,172 @@
+from django.conf import settings
+from graphql import GraphQLError
+from graphql.backend.core import GraphQLCoreBackend
+from graphql.execution import ExecutionResult
+from graphql.language import ast
+from graphql.type import GraphQLList, GraphQLNonNull
+
+# cost of resolving a field once, by "Type.field" schema names. Fields that aren't listed cost 1 when they
+# return objects and nothing when they return scalars.
+FIELD_COSTS = {
+    "CapabilityType.tasks": 2,
+    "PersonType.claimedTask": 2,
+    "ProductType.capabilities": 2,
+}
+
+# arguments limiting how many items a list or a connection returns
+SIZE_ARGUMENTS = ("first", "last")
+
+
+class QueryCostError(GraphQLError):
+    pass
+
+
+def unwrap_type(graphql_type):
+    """(named type, whether it's a list) of a field type"""
+    is_list = False
+    while isinstance(graphql_type, (GraphQLList, GraphQLNonNull)):
+        is_list = is_list or isinstance(graphql_type, GraphQLList)
+        graphql_type = graphql_type.of_type
+    return graphql_type, is_list
+
+
+def get_argument_value(value, variables):
+    if isinstance(value, ast.Variable):
+        return variables.get(value.name.value)
+    if isinstance(value, ast.IntValue):
+        return int(value.value)
+    return None
+
+
+class QueryCostAnalyzer:
+    """Static cost and depth of a GraphQL operation, computed from its AST before it runs.
+
+    The cost of a field is its weight plus the cost of its selections, multiplied by the number of items
+    it returns. That's the first/last argument when given, GRAPHQL_DEFAULT_LIST_SIZE for other lists and
+    1 for objects.
+    """
+
+    def __init__(self, schema, document_ast, variables=None):
+        self.schema = schema
+        self.variables = variables or {}
+        self.fragments = {
+            definition.name.value: definition
+            for definition in document_ast.definitions
+            if isinstance(definition, ast.FragmentDefinition)
+        }
+        self.operations = [
+            definition for definition in document_ast.definitions
+            if isinstance(definition, ast.OperationDefinition)
+        ]
+
+    def get_operation(self, operation_name=None):
+        for operation in self.operations:
+            if operation_name is None or (operation.name and operation.name.value == operation_name):
+                return operation
+        return None
+
+    def get_root_type(self, operation):
+        if operation.operation == "mutation":
+            return self.schema.get_mutation_type()
+        if operation.operation == "subscription":
+            return self.schema.get_subscription_type()
+        return self.schema.get_query_type()
+
+    def analyze(self, operation_name=None):
+        """(cost, depth) of the operation, (0, 0) when it's missing and left for validation to report"""
+        operation = self.get_operation(operation_name)
+        root_type = self.get_root_type(operation) if operation else None
+        if not root_type:
+            return 0, 0
+        return self.get_selection_cost(operation.selection_set, root_type, 1, frozenset())
+
+    def get_size(self, field_node, is_list):
+        for argument in field_node.arguments or []:
+            if argument.name.value in SIZE_ARGUMENTS:
+                size = get_argument_value(argument.value, self.variables)
+                if isinstance(size, int):
+                    return min(max(size, 0), settings.GRAPHENE["RELAY_CONNECTION_MAX_LIMIT"])
+        return settings.GRAPHQL_DEFAULT_LIST_SIZE if is_list else 1
+
+    def get_selection_cost(self, selection_set, parent_type, depth, fragment_names):
+        cost = 0
+        max_depth = depth - 1
+        fields = getattr(parent_type, "fields", None) or {}
+        for selection in selection_set.selections if selection_set else []:
+            if isinstance(selection, ast.Field):
+                name = selection.name.value
+                # introspection and unknown fields are left to validation
+                if name.startswith("__") or name not in fields:
+                    continue
+
+                field_type, is_list = unwrap_type(fields[name].type)
+                has_fields = hasattr(field_type, "fields")
+                weight = FIELD_COSTS.get(f"{parent_type.name}.{name}", 1 if has_fields else 0)
+                child_cost, child_depth = self.get_selection_cost(
+                    selection.selection_set, field_type, depth + 1, fragment_names
+                )
+                # edges are already counted by the page size of their connection
+                size = 1 if name == "edges" else self.get_size(selection, is_list)
+                cost += size * (weight + child_cost)
+                max_depth = max(max_depth, child_depth, depth)
+                continue
+
+            if isinstance(selection, ast.FragmentSpread):
+                name = selection.name.value
+                fragment = self.fragments.get(name)
+                # cycles are reported by validation
+                if not fragment or name in fragment_names:
+                    continue
+                fragment_type = self.schema.get_type(fragment.type_condition.name.value)
+                child_cost, child_depth = self.get_selection_cost(
+                    fragment.selection_set, fragment_type or parent_type, depth, fragment_names | {name}
+                )
+            else:
+                fragment_type = parent_type
+                if selection.type_condition:
+                    fragment_type = self.schema.get_type(selection.type_condition.name.value) or parent_type
+                child_cost, child_depth = self.get_selection_cost(
+                    selection.selection_set, fragment_type, depth, fragment_names
+                )
+
+            cost += child_cost
+            max_depth = max(max_depth, child_depth)
+
+        return cost, max_depth
+
+
+def check_query_cost(schema, document_ast, operation_name=None, variables=None):
+    """Cost report of the operation, raises QueryCostError when it's over GRAPHQL_MAX_DEPTH or GRAPHQL_MAX_COST"""
+    cost, depth = QueryCostAnalyzer(schema, document_ast, variables).analyze(operation_name)
+    report = dict(requested=cost, maximum=settings.GRAPHQL_MAX_COST, depth=depth,
+                  maximumDepth=settings.GRAPHQL_MAX_DEPTH)
+
+    if depth > settings.GRAPHQL_MAX_DEPTH:
+        raise QueryCostError(f"Query depth {depth} exceeds the maximum depth of {settings.GRAPHQL_MAX_DEPTH}")
+    if cost > settings.GRAPHQL_MAX_COST:
+        raise QueryCostError(f"Query cost {cost} exceeds the maximum cost of {settings.GRAPHQL_MAX_COST}")
+
+    return report
+
+
+class QueryCostBackend(GraphQLCoreBackend):
+    """Core backend rejecting operations over the depth or cost limits before they run, the cost
+    is reported in the result extensions"""
+
+    def document_from_string(self, schema, document_string):
+        document = super().document_from_string(schema, document_string)
+        execute = document.execute
+
+        def execute_with_cost(*args, **kwargs):
+            try:
+                report = check_query_cost(schema, document.document_ast, kwargs.get("operation_name"),
+                                          kwargs.get("variable_values"))
+            except QueryCostError as e:
+                return ExecutionResult(errors=[e], invalid=True)
+
+            result = execute(*args, **kwargs)
+            result.extensions["cost"] = report
+            return result
+
+        document.execute = execute_with_cost
+        return document
@@ -11,6 +11,9 @@ class IdeaType(DjangoObjectType):
         model = Idea
 
     def resolve_vote_up(self, info):
+        # the ideas query annotates the count
+        if hasattr(self, "vote_up"):
+            return self.vote_up
         return self.ideavote_set.filter(vote_type=0).count()
 
 
@@ -21,4 +24,7 @@ class BugType(DjangoObjectType):
         model = Bug
 
     def resolve_vote_up(self, info):
+        # the bugs query annotates the count
+        if hasattr(self, "vote_up"):
+            return self.vote_up
         return self.bugvote_set.filter(vote_type=0).count()
@@ -18,7 +18,7 @@ class UpdateLicenseMutation(graphene.Mutation):
     @is_current_person
     def mutate(current_person, info, *args, **kwargs):
         license_input = kwargs.get("license_input")
-        if is_admin(user_id=current_person.id, product_slug=license_input.product_slug):
+        if is_admin(current_person, license_input.product_slug):
             ContributorAgreement.objects.create(
                 product_id=Product.objects.get(slug=license_input.product_slug).id,
                 agreement_content=license_input.content
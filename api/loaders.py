@@ -0,0 +1,82 @@
+from collections import defaultdict
+
+from promise import Promise
+from promise.dataloader import DataLoader
+
+from matching.models import TaskClaim
+from work.models import ProductTask, Task, TaskDepend
+
+
+class TaskClaimsLoader(DataLoader):
+    """task id -> claims of the task ordered by id"""
+
+    def batch_load_fn(self, task_ids):
+        claims = defaultdict(list)
+        for claim in TaskClaim.objects.filter(task_id__in=task_ids).select_related("person__user").order_by("id"):
+            claims[claim.task_id].append(claim)
+        return Promise.resolve([claims[task_id] for task_id in task_ids])
+
+
+class TaskDependsOnLoader(DataLoader):
+    """task id -> tasks the task depends on"""
+
+    def batch_load_fn(self, task_ids):
+        depends = defaultdict(list)
+        for depend in TaskDepend.objects.filter(task_id__in=task_ids).select_related("depends_by"):
+            depends[depend.task_id].append(depend.depends_by)
+        return Promise.resolve([depends[task_id] for task_id in task_ids])
+
+
+class TaskRelativesLoader(DataLoader):
+    """task id -> tasks that depend on the task"""
+
+    def batch_load_fn(self, task_ids):
+        relatives = defaultdict(list)
+        for depend in TaskDepend.objects.filter(depends_by_id__in=task_ids).select_related("task"):
+            relatives[depend.depends_by_id].append(depend.task)
+        return Promise.resolve([relatives[task_id] for task_id in task_ids])
+
+
+class TaskExpertiseLoader(DataLoader):
+    """task id -> expertise of the task"""
+
+    def batch_load_fn(self, task_ids):
+        expertise = defaultdict(list)
+        through = Task.expertise.through.objects.filter(task_id__in=task_ids).select_related("expertise")
+        for task_expertise in through.order_by("expertise_id"):
+            expertise[task_expertise.task_id].append(task_expertise.expertise)
+        return Promise.resolve([expertise[task_id] for task_id in task_ids])
+
+
+class TaskProductLoader(DataLoader):
+    """task id -> product of the task (through ProductTask) with its owner loaded"""
+
+    def batch_load_fn(self, task_ids):
+        products = {}
+        product_tasks = ProductTask.objects \
+            .filter(task_id__in=task_ids) \
+            .select_related("product__owner__organisation", "product__owner__person__user") \
+            .order_by("id")
+        for product_task in product_tasks:
+            products.setdefault(product_task.task_id, product_task.product)
+        return Promise.resolve([products.get(task_id) for task_id in task_ids])
+
+
+class Loaders:
+    """Per-request loaders, each one batches the keys requested while a response is resolved"""
+
+    def __init__(self):
+        self.task_claims = TaskClaimsLoader()
+        self.task_depends_on = TaskDependsOnLoader()
+        self.task_relatives = TaskRelativesLoader()
+        self.task_expertise = TaskExpertiseLoader()
+        self.task_product = TaskProductLoader()
+
+
+def get_loaders(info):
+    context = info.context
+    loaders = getattr(context, "loaders", None)
+    if loaders is None:
+        loaders = Loaders()
+        context.loaders = loaders
+    return loaders
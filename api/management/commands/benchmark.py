@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+
+from api.benchmark import OPERATIONS, compare_with_baseline, run_benchmark, seed_benchmark_data
+from work.models import Product
+
+
+class Command(BaseCommand):
+    help = "Seed a synthetic dataset in a test database, replay the main GraphQL operations and compare " \
+           "their latency and query counts with a baseline"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=3)
+        parser.add_argument("--tasks", type=int, default=100, help="Tasks per product")
+        parser.add_argument("--persons", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument("--operation", action="append", dest="operations",
+                            help="Only run this operation, can be repeated")
+        parser.add_argument("--baseline", default=os.path.join(settings.BASE_DIR, "benchmark_baseline.json"))
+        parser.add_argument("--update-baseline", action="store_true",
+                            help="Store the results as the new baseline instead of comparing them")
+        parser.add_argument("--tolerance", type=float, default=0.2,
+                            help="Allowed p95 slowdown against the baseline, 0.2 is 20%%")
+        parser.add_argument("--keepdb", action="store_true",
+                            help="Keep the test database and its data for the next run")
+
+    def handle(self, *args, **options):
+        operations = OPERATIONS
+        if options["operations"]:
+            operations = [operation for operation in OPERATIONS if operation["name"] in options["operations"]]
+
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options["keepdb"])
+        try:
+            if not Product.objects.filter(slug="benchmark0").exists():
+                self.stdout.write("Seeding benchmark data...")
+                seed_benchmark_data(options["products"], options["tasks"], options["persons"], options["seed"])
+
+            results = run_benchmark(operations, options["iterations"], options["warmup"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+
+        baseline = {}
+        if os.path.exists(options["baseline"]):
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)
+
+        self.stdout.write(f"{'operation':<26}{'p50 ms':>10}{'p95 ms':>10}{'queries':>9}{'baseline p95':>14}"
+                          f"{'baseline queries':>18}")
+        for name, result in results.items():
+            expected = baseline.get(name, {})
+            self.stdout.write(f"{name:<26}{result['p50_ms']:>10}{result['p95_ms']:>10}{result['queries']:>9}"
+                              f"{expected.get('p95_ms', '-'):>14}{expected.get('queries', '-'):>18}")
+
+        if options["update_baseline"]:
+            with open(options["baseline"], "w") as f:
+                json.dump(dict(baseline, **results), f, indent=2, sort_keys=True)
+            self.stdout.write(f"Baseline stored in {options['baseline']}")
+            return
+
+        regressions = compare_with_baseline(results, baseline, options["tolerance"])
+        if regressions:
+            raise CommandError("Regressions against the baseline:\n" + "\n".join(regressions))
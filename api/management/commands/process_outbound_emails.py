@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+import json
+import time
+
+from django.core.management import BaseCommand
+from emails.services import get_outbound_email_metrics, process_outbound_emails
+
+
+class Command(BaseCommand):
+    help = "Send the emails queued in OutboundEmail"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--interval", type=float, default=5.0,
+                            help="Seconds to sleep when no email is due")
+        parser.add_argument("--once", action="store_true",
+                            help="Send the due emails and exit instead of polling forever")
+        parser.add_argument("--metrics", action="store_true",
+                            help="Print the queue metrics as JSON and exit")
+
+    def handle(self, *args, **options):
+        if options["metrics"]:
+            self.stdout.write(json.dumps(get_outbound_email_metrics()))
+            return
+
+        batch_size = options["batch_size"]
+        interval = options["interval"]
+
+        while True:
+            stats = process_outbound_emails(batch_size)
+            if any(stats.values()):
+                self.stdout.write(f"Sent {stats['sent']} emails, {stats['retried']} to retry, "
+                                  f"{stats['failed']} failed")
+                continue
+
+            if options["once"]:
+                break
+            time.sleep(interval)
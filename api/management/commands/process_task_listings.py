@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+import time
+
+from django.core.management import BaseCommand
+from work.services import process_task_listing_queue
+
+
+class Command(BaseCommand):
+    help = "Rebuild TaskListing rows for tasks queued in TaskListingQueue"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--interval", type=float, default=1.0,
+                            help="Seconds to sleep when the queue is empty")
+        parser.add_argument("--once", action="store_true",
+                            help="Drain the queue and exit instead of polling forever")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        interval = options["interval"]
+
+        while True:
+            processed = process_task_listing_queue(batch_size)
+            if processed:
+                self.stdout.write(f"Rebuilt {processed} task listings")
+                continue
+
+            if options["once"]:
+                break
+            time.sleep(interval)
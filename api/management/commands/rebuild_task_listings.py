@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import time
+
+from django.core.management import BaseCommand, CommandError
+from work.models import Product, Task
+from work.services import rebuild_all_task_listings
+
+
+class Command(BaseCommand):
+    help = "Rebuild TaskListing rows in chunks, optionally for one product and resuming from a checkpoint"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--product", help="Slug of the product to rebuild, all products by default")
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument("--start-after", type=int, default=0, help="Skip tasks with id up to this value")
+        parser.add_argument("--checkpoint",
+                            help="File storing the last rebuilt task id, an existing checkpoint is resumed")
+
+    def read_checkpoint(self, path, product_slug):
+        if not path or not os.path.exists(path):
+            return 0
+
+        with open(path) as checkpoint_file:
+            checkpoint = json.load(checkpoint_file)
+
+        if checkpoint.get("product") != product_slug:
+            raise CommandError(f"Checkpoint {path} was written for another product scope")
+
+        return checkpoint["last_task_id"]
+
+    def handle(self, *args, **options):
+        product_slug = options["product"]
+        checkpoint_path = options["checkpoint"]
+
+        product_id = None
+        if product_slug:
+            try:
+                product_id = Product.objects.get(slug=product_slug).id
+            except Product.DoesNotExist:
+                raise CommandError(f"Product {product_slug} doesn't exist")
+
+        start_after = max(options["start_after"], self.read_checkpoint(checkpoint_path, product_slug))
+
+        tasks = Task.objects.all()
+        if product_id:
+            tasks = tasks.filter(product_id=product_id)
+        total = tasks.filter(id__gt=start_after).count()
+        if start_after:
+            self.stdout.write(f"Resuming after task {start_after}")
+
+        started_at = time.monotonic()
+
+        def on_chunk(last_task_id, written):
+            if checkpoint_path:
+                with open(checkpoint_path, "w") as checkpoint_file:
+                    json.dump({"product": product_slug, "last_task_id": last_task_id}, checkpoint_file)
+
+            elapsed = time.monotonic() - started_at
+            percent = written * 100 / total if total else 100
+            self.stdout.write(f"{written}/{total} task listings ({percent:.0f}%), "
+                              f"last task {last_task_id}, {written / elapsed:.0f} tasks/s")
+
+        written = rebuild_all_task_listings(product_id=product_id,
+                                            chunk_size=options["chunk_size"],
+                                            start_after=start_after,
+                                            on_chunk=on_chunk)
+
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} task listings"))
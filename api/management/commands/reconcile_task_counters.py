@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+from django.core.management import BaseCommand
+from work.models import TaskCounter
+
+
+class Command(BaseCommand):
+    help = "Recount the per product and per initiative task counters from the tasks table"
+
+    def handle(self, *args, **options):
+        rows = TaskCounter.reconcile()
+        self.stdout.write(f"Reconciled {rows} task counters")
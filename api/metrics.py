@@ -0,0 +1,166 @@
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+# upper bounds (ms) of the histogram buckets, the last bucket holds everything slower
+BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+# operation names come from clients, further names are counted under "other" to bound the memory use
+MAX_KEYS = 2000
+
+
+class Stats:
+    """Call count, wall time and SQL of one resolver path or operation with a histogram of the wall time"""
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.max_time = 0.0
+        self.queries = 0
+        self.sql_time = 0.0
+        self.histogram = [0] * (len(BUCKETS) + 1)
+
+    def add(self, duration, queries=0, sql_time=0.0):
+        ms = duration * 1000
+        bucket = 0
+        while bucket < len(BUCKETS) and ms > BUCKETS[bucket]:
+            bucket += 1
+
+        self.count += 1
+        self.time += duration
+        self.max_time = max(self.max_time, duration)
+        self.queries += queries
+        self.sql_time += sql_time
+        self.histogram[bucket] += 1
+
+    def merge(self, stats):
+        self.count += stats.count
+        self.time += stats.time
+        self.max_time = max(self.max_time, stats.max_time)
+        self.queries += stats.queries
+        self.sql_time += stats.sql_time
+        self.histogram = [a + b for a, b in zip(self.histogram, stats.histogram)]
+
+    def to_dict(self):
+        return dict(
+            count=self.count,
+            time_ms=round(self.time * 1000, 3),
+            avg_ms=round(self.time * 1000 / self.count, 3) if self.count else 0,
+            max_ms=round(self.max_time * 1000, 3),
+            queries=self.queries,
+            sql_time_ms=round(self.sql_time * 1000, 3),
+            histogram={
+                f"le_{bound}" if i < len(BUCKETS) else "inf": count
+                for i, (bound, count) in enumerate(zip(BUCKETS + (None,), self.histogram))
+            },
+        )
+
+
+class MetricsRegistry:
+    """In-process metrics of the GraphQL operations and resolvers served by this worker"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.operations = defaultdict(Stats)
+            self.resolvers = defaultdict(Stats)
+
+    @staticmethod
+    def get_key(stats, key):
+        return key if key in stats or len(stats) < MAX_KEYS else "other"
+
+    def add(self, operation):
+        with self.lock:
+            name = self.get_key(self.operations, operation.name)
+            self.operations[name].add(operation.duration, operation.queries, operation.sql_time)
+            for path, stats in operation.resolvers.items():
+                self.resolvers[self.get_key(self.resolvers, f"{name}:{path}")].merge(stats)
+
+    def to_dict(self):
+        with self.lock:
+            return dict(
+                buckets_ms=list(BUCKETS),
+                operations={name: stats.to_dict() for name, stats in self.operations.items()},
+                resolvers={path: stats.to_dict() for path, stats in self.resolvers.items()},
+            )
+
+
+registry = MetricsRegistry()
+
+
+class OperationMetrics:
+    """Metrics of one GraphQL operation, queries are recorded by record_query installed as a database
+    execute wrapper and attributed to the resolver running at the time"""
+
+    def __init__(self, name):
+        self.name = name or "anonymous"
+        self.started_at = time.perf_counter()
+        self.duration = 0.0
+        self.queries = 0
+        self.sql_time = 0.0
+        self.statements = []
+        self.resolvers = defaultdict(Stats)
+        self.current = None
+
+    def record_query(self, execute, sql, params, many, context):
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started_at
+            self.queries += 1
+            self.sql_time += duration
+            if self.current:
+                self.current[0] += 1
+                self.current[1] += duration
+            if settings.GRAPHQL_SLOW_OPERATION_MS is not None and len(self.statements) < 100:
+                self.statements.append((duration, sql))
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started_at
+        registry.add(self)
+
+        slow_ms = settings.GRAPHQL_SLOW_OPERATION_MS
+        if slow_ms is not None and self.duration * 1000 >= slow_ms:
+            print(f"Slow GraphQL operation {self.name}: {self.duration * 1000:.1f} ms, "
+                  f"{self.queries} queries in {self.sql_time * 1000:.1f} ms", flush=True)
+            for duration, sql in sorted(self.statements, key=lambda statement: -statement[0])[:10]:
+                print(f"  {duration * 1000:.1f} ms: {sql}", flush=True)
+
+
+def get_resolver_path(info):
+    return ".".join(str(key) for key in info.path if not isinstance(key, int))
+
+
+class MetricsMiddleware:
+    """Records wall time and SQL of every resolver in the OperationMetrics of the request.
+
+    Only the synchronous part of a resolver is timed, queries of DataLoader batches are counted for the
+    operation. Leaf fields are only recorded when they ran a query.
+    """
+
+    def resolve(self, next, root, info, **args):
+        operation = getattr(info.context, "graphql_metrics", None)
+        if operation is None:
+            return next(root, info, **args)
+
+        parent = operation.current
+        current = operation.current = [0, 0.0]
+        started_at = time.perf_counter()
+        try:
+            return next(root, info, **args)
+        finally:
+            duration = time.perf_counter() - started_at
+            operation.current = parent
+            if current[0] or not is_leaf(info.return_type):
+                operation.resolvers[get_resolver_path(info)].add(duration, current[0], current[1])
+
+
+def is_leaf(graphql_type):
+    while hasattr(graphql_type, "of_type"):
+        graphql_type = graphql_type.of_type
+    return not hasattr(graphql_type, "fields")
@@ -0,0 +1,21 @@
+from django.db import transaction
+from promise import Promise
+
+
+class MutationTransactionMiddleware:
+    """Runs every root field of a mutation in its own transaction, everything else runs in autocommit.
+
+    A mutation that raises is rolled back, mutations of the same operation that already finished stay
+    committed.
+    """
+
+    def resolve(self, next, root, info, **args):
+        if info.operation.operation != "mutation" or len(info.path) != 1:
+            return next(root, info, **args)
+
+        with transaction.atomic():
+            result = next(root, info, **args)
+            # resolvers are wrapped in promises, waiting for them raises the errors inside the transaction
+            if isinstance(result, Promise):
+                result = result.get()
+            return result
@@ -0,0 +1,122 @@
+import base64
+import binascii
+import datetime
+import json
+
+import graphene
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from graphene.relay import PageInfo
+
+
+class CountableConnection(graphene.relay.Connection):
+    """Relay connection with an optional total count, the COUNT query only runs when the field is requested"""
+    total_count = graphene.Int()
+
+    class Meta:
+        abstract = True
+
+    def resolve_total_count(self, info):
+        return self.iterable.count()
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder cuts datetimes to milliseconds, a cursor needs the exact sort key to not repeat rows"""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(value, pk):
+    return base64.urlsafe_b64encode(json.dumps([value, pk], cls=CursorEncoder).encode()).decode()
+
+
+def decode_cursor(cursor, field):
+    try:
+        value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return field.to_python(value) if value is not None else None, pk
+    except (binascii.Error, ValueError, TypeError, ValidationError):
+        raise Exception("Invalid cursor")
+
+
+def get_sort_field(model, sorted_by):
+    descending = sorted_by.startswith("-")
+    try:
+        field = model._meta.get_field(sorted_by.lstrip("-"))
+    except FieldDoesNotExist:
+        raise Exception(f"Cannot sort by {sorted_by}")
+
+    if not field.concrete or field.many_to_many or field.one_to_many:
+        raise Exception(f"Cannot sort by {sorted_by}")
+
+    return field, descending
+
+
+def get_keyset_filter(field, descending, value, pk):
+    """Rows strictly after (value, pk) in ORDER BY field, pk, NULLs sort last ascending and first descending"""
+    name = field.attname
+    if descending:
+        if value is None:
+            return Q(**{f"{name}__isnull": True, "pk__lt": pk}) | Q(**{f"{name}__isnull": False})
+        return Q(**{f"{name}__lt": value}) | Q(**{name: value, "pk__lt": pk})
+
+    if value is None:
+        return Q(**{f"{name}__isnull": True, "pk__gt": pk})
+    return Q(**{f"{name}__gt": value}) | Q(**{name: value, "pk__gt": pk}) | Q(**{f"{name}__isnull": True})
+
+
+def paginate_keyset(queryset, connection_type, sorted_by="title", first=None, after=None, last=None, before=None):
+    """Slice a queryset by (sort key, id) cursors, every page is a single index range scan.
+
+    The cursors are opaque base64 strings and stay valid when rows are inserted or deleted in between.
+    """
+    max_limit = settings.GRAPHENE.get("RELAY_CONNECTION_MAX_LIMIT", 100)
+    if first is None and last is None:
+        first = max_limit
+    if (first is not None and first < 0) or (last is not None and last < 0):
+        raise Exception("first and last must be positive")
+
+    field, descending = get_sort_field(queryset.model, sorted_by or "title")
+    backwards = last is not None and first is None
+    limit = min(last if backwards else first, max_limit)
+    sort_field = f"-{field.attname}" if descending else field.attname
+    pk_field = "-pk" if descending else "pk"
+
+    page = queryset
+    if after:
+        page = page.filter(get_keyset_filter(field, descending, *decode_cursor(after, field)))
+    if before:
+        page = page.filter(get_keyset_filter(field, not descending, *decode_cursor(before, field)))
+
+    if backwards:
+        # walk the reversed order from the end and flip the page back afterwards
+        reversed_sort = field.attname if descending else f"-{field.attname}"
+        page = page.order_by(reversed_sort, "pk" if descending else "-pk")
+    else:
+        page = page.order_by(sort_field, pk_field)
+
+    nodes = list(page[:limit + 1])
+    has_more = len(nodes) > limit
+    nodes = nodes[:limit]
+    if backwards:
+        nodes.reverse()
+
+    edges = [
+        connection_type.Edge(node=node, cursor=encode_cursor(getattr(node, field.attname), node.pk))
+        for node in nodes
+    ]
+    connection = connection_type(
+        edges=edges,
+        page_info=PageInfo(
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+            has_previous_page=has_more if backwards else bool(after),
+            has_next_page=bool(before) if backwards else has_more,
+        )
+    )
+    connection.iterable = queryset
+    return connection
@@ -11,6 +11,11 @@ from talent.models import Person, ProductPerson, PersonProfile, Review, PersonSo
 from work.models import Task, Product, Initiative
 
 
+def get_last(related):
+    """The row .last() returns, the highest id, taken from the prefetched rows when the relation is prefetched"""
+    return max(related.all(), key=lambda row: row.pk, default=None)
+
+
 class PersonSocialType(DjangoObjectType):
     class Meta:
         model = PersonSocial
@@ -54,6 +59,7 @@ class WebsiteInput(graphene.InputObjectType):
 
 class PersonPreferencesInput(graphene.InputObjectType):
     send_me_challenges = graphene.Boolean(required=True)
+    send_me_mentions = graphene.Boolean(required=False)
 
 
 class PersonInput(graphene.InputObjectType):
@@ -132,7 +138,7 @@ class WebsiteType(DjangoObjectType):
 class PersonPreferencesType(DjangoObjectType):
     class Meta:
         model = PersonPreferences
-        fields = ('send_me_challenges', )
+        fields = ('send_me_challenges', 'send_me_mentions')
 
 
 class PersonPortfolioType(DjangoObjectType):
@@ -147,23 +153,23 @@ class PersonPortfolioType(DjangoObjectType):
     preferences = graphene.Field(PersonPreferencesType)
 
     def resolve_bio(self, info):
-        profile = self.profile.last()
+        profile = get_last(self.profile)
         return profile.overview
 
     def resolve_avatar(self, info):
-        profile = self.profile.last()
+        profile = get_last(self.profile)
         if profile:
             avatar = profile.avatar if profile.avatar else None
             return avatar.avatar if avatar else None
 
     def resolve_skills(self, info):
-        profile = self.profile.last()
+        profile = get_last(self.profile)
         if profile:
             return profile.skills.all()
         return []
 
     def resolve_websites(self, info):
-        profile = self.profile.last()
+        profile = get_last(self.profile)
         if profile:
             return profile.websites.all()
         return []
@@ -172,7 +178,7 @@ class PersonPortfolioType(DjangoObjectType):
         return [website_type[1] for website_type in PersonWebsite.WebsiteType]
 
     def resolve_preferences(self, info):
-        preferences = self.preferences.last()
+        preferences = get_last(self.preferences)
         return preferences
 
 
@@ -185,7 +191,7 @@ class ReviewerType(DjangoObjectType):
     link = graphene.String()
 
     def resolve_avatar(self, info):
-        profile = self.profile.last()
+        profile = get_last(self.profile)
         return profile.avatar.avatar if profile and profile.avatar else None
 
     def resolve_username(self, info):
@@ -0,0 +1,336 @@
+import base64
+import json
+import os
+from datetime import datetime, timedelta
+from unittest import mock
+
+import graphene
+from django.db import connection
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from graphql import parse
+
+from api.benchmark import (
+    OPERATIONS, capture_queries, check_query_budget, compare_with_baseline, get_query_budget, load_query_budgets,
+    run_benchmark, seed_benchmark_data, store_query_budgets,
+)
+from api.cost import QueryCostAnalyzer, QueryCostError, check_query_cost
+from api.metrics import MetricsMiddleware, registry
+from api.middleware import MutationTransactionMiddleware
+from api.pagination import CountableConnection, decode_cursor, encode_cursor, paginate_keyset
+from api.views import GraphQLView
+from backend.test_base import TestCase
+from users.models import User
+
+
+class Node(graphene.ObjectType):
+    id = graphene.Int()
+    children = graphene.List(lambda: Node, first=graphene.Int())
+    parent = graphene.Field(lambda: Node)
+
+
+class Query(graphene.ObjectType):
+    nodes = graphene.List(Node, first=graphene.Int())
+
+    def resolve_nodes(self, info, first=2):
+        for _ in range(first):
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        return [Node(id=i) for i in range(first)]
+
+
+class CreateUser(graphene.Mutation):
+    class Arguments:
+        username = graphene.String()
+        fail = graphene.Boolean()
+
+    savepoints = graphene.Int()
+
+    @staticmethod
+    def mutate(root, info, username, fail=False):
+        User.objects.create(username=username, email=f"{username}@example.com")
+        if fail:
+            raise Exception("Mutation failed")
+        return CreateUser(savepoints=len(connection.savepoint_ids))
+
+
+class Mutation(graphene.ObjectType):
+    create_user = CreateUser.Field()
+
+
+schema = graphene.Schema(query=Query, mutation=Mutation)
+
+
+class UserConnection(CountableConnection):
+    class Meta:
+        node = Node
+
+
+@override_settings(GRAPHQL_DEFAULT_LIST_SIZE=10, GRAPHQL_MAX_DEPTH=4, GRAPHQL_MAX_COST=1000)
+class QueryCostTest(TestCase):
+    def analyze(self, query, variables=None, operation_name=None):
+        return QueryCostAnalyzer(schema, parse(query), variables).analyze(operation_name)
+
+    def test_cost(self):
+        self.assertEqual(self.analyze("{ nodes { id } }"), (10, 2))
+        self.assertEqual(self.analyze("{ nodes(first: 3) { id parent { id } } }"), (6, 3))
+        self.assertEqual(self.analyze("{ nodes(first: 2) { children { id } } }"), (2 * (1 + 10), 3))
+        self.assertEqual(
+            self.analyze("query Nodes($first: Int) { nodes(first: $first) { id } }", {"first": 5}),
+            (5, 2),
+        )
+        # sizes are capped by RELAY_CONNECTION_MAX_LIMIT
+        self.assertEqual(self.analyze("{ nodes(first: 100000) { id } }"), (100, 2))
+
+    def test_fragments(self):
+        query = """
+            query A { nodes(first: 2) { ...Children } }
+            query B { nodes(first: 2) { ... on Node { parent { id } } } }
+            fragment Children on Node { children(first: 2) { id } }
+        """
+        self.assertEqual(self.analyze(query, operation_name="A"), (2 * (1 + 2), 3))
+        self.assertEqual(self.analyze(query, operation_name="B"), (2 * (1 + 1), 3))
+        # introspection and unknown fields are left to validation
+        self.assertEqual(self.analyze("{ __typename nodes { unknown } }"), (10, 1))
+
+    def test_limits(self):
+        self.assertEqual(check_query_cost(schema, parse("{ nodes { id } }"))["requested"], 10)
+
+        with self.assertRaisesMessage(QueryCostError, "Query depth 5 exceeds the maximum depth of 4"):
+            check_query_cost(schema, parse("{ nodes(first: 1) { parent { parent { parent { id } } } } }"))
+
+        with self.assertRaisesMessage(QueryCostError, "Query cost 1110 exceeds the maximum cost of 1000"):
+            check_query_cost(schema, parse("{ nodes { children { children { id } } } }"))
+
+
+class GraphQLViewTest(TestCase):
+    def post(self, query):
+        response = self.client.post("/graphql", json.dumps({"query": query}), content_type="application/json")
+        return response.status_code, response.json()
+
+    def test_cost_extension(self):
+        status_code, content = self.post("{ tasks { id } }")
+        self.assertEqual(status_code, 200)
+        self.assertEqual(content["extensions"]["cost"]["requested"], 20)
+
+    def test_costly_query(self):
+        status_code, content = self.post("{ tasks { dependOn { relatives { dependOn { id } } } } }")
+        self.assertEqual(status_code, 400)
+        self.assertNotIn("data", content)
+        self.assertIn("exceeds the maximum cost", content["errors"][0]["message"])
+
+
+class MutationTransactionTest(TestCase):
+    def execute(self, query):
+        return schema.execute(query, middleware=[MutationTransactionMiddleware()])
+
+    def test_transaction_per_mutation(self):
+        savepoints = len(connection.savepoint_ids)
+        result = self.execute("""
+            mutation {
+                first: createUser(username: "first") { savepoints }
+                second: createUser(username: "second", fail: true) { savepoints }
+            }
+        """)
+
+        self.assertEqual(result.data["first"]["savepoints"], savepoints + 1)
+        self.assertEqual(str(result.errors[0]), "Mutation failed")
+        self.assertTrue(User.objects.filter(username="first").exists())
+        self.assertFalse(User.objects.filter(username="second").exists())
+
+    def test_query_without_transaction(self):
+        with self.assertNumQueries(2):
+            self.assertIsNone(self.execute("{ nodes { id } }").errors)
+
+
+class KeysetPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # runs of equal sort keys, NULLs in between and microseconds the cursor has to keep
+        start = timezone.make_aware(datetime(2021, 1, 1, 12, 0, 0, 123456))
+        cls.users = [
+            User.objects.create(
+                username=f"user{i}",
+                email=f"{'abc'[i % 3]}@example.com",
+                last_login=None if i % 4 == 1 else start + timedelta(microseconds=i % 3),
+            )
+            for i in range(14)
+        ]
+
+    def get_expected(self, attname, descending):
+        # postgres sorts NULLs last ascending and first descending
+        def key(user):
+            value = getattr(user, attname)
+            return value is None, value or "", user.pk
+
+        users = sorted(self.users, key=key, reverse=descending)
+        return [user.pk for user in users]
+
+    def paginate(self, sorted_by, **kwargs):
+        return paginate_keyset(User.objects.all(), UserConnection, sorted_by=sorted_by, **kwargs)
+
+    def page_forwards(self, sorted_by, size):
+        ids = []
+        connection = self.paginate(sorted_by, first=size)
+        self.assertFalse(connection.page_info.has_previous_page)
+        for _ in self.users:
+            ids += [edge.node.pk for edge in connection.edges]
+            if not connection.page_info.has_next_page:
+                return ids
+            self.assertEqual(len(connection.edges), size)
+            connection = self.paginate(sorted_by, first=size, after=connection.page_info.end_cursor)
+            self.assertTrue(connection.page_info.has_previous_page)
+        self.fail("Paging doesn't end")
+
+    def page_backwards(self, sorted_by, size):
+        ids = []
+        connection = self.paginate(sorted_by, last=size)
+        self.assertFalse(connection.page_info.has_next_page)
+        for _ in self.users:
+            ids = [edge.node.pk for edge in connection.edges] + ids
+            if not connection.page_info.has_previous_page:
+                return ids
+            self.assertEqual(len(connection.edges), size)
+            connection = self.paginate(sorted_by, last=size, before=connection.page_info.start_cursor)
+            self.assertTrue(connection.page_info.has_next_page)
+        self.fail("Paging doesn't end")
+
+    def test_cursor(self):
+        field = User._meta.get_field("last_login")
+        value = self.users[0].last_login
+        self.assertEqual(decode_cursor(encode_cursor(value, 7), field), (value, 7))
+        self.assertEqual(decode_cursor(encode_cursor(None, 7), field), (None, 7))
+
+    def test_keyset_filter(self):
+        for sorted_by in ["email", "-email", "last_login", "-last_login"]:
+            expected = self.get_expected(sorted_by.lstrip("-"), sorted_by.startswith("-"))
+            for index, pk in enumerate(expected):
+                user = User.objects.get(pk=pk)
+                cursor = encode_cursor(getattr(user, sorted_by.lstrip("-")), pk)
+                with self.subTest(sorted_by=sorted_by, index=index):
+                    after = self.paginate(sorted_by, after=cursor)
+                    self.assertEqual([edge.node.pk for edge in after.edges], expected[index + 1:])
+                    before = self.paginate(sorted_by, before=cursor)
+                    self.assertEqual([edge.node.pk for edge in before.edges], expected[:index])
+
+    def test_pages(self):
+        for sorted_by in ["email", "-email", "last_login", "-last_login"]:
+            expected = self.get_expected(sorted_by.lstrip("-"), sorted_by.startswith("-"))
+            for size in [1, 3, 5, 14, 20]:
+                with self.subTest(sorted_by=sorted_by, size=size):
+                    self.assertEqual(self.page_forwards(sorted_by, size), expected)
+                    self.assertEqual(self.page_backwards(sorted_by, size), expected)
+
+    def test_empty_page(self):
+        connection = self.paginate("email", first=0)
+        self.assertEqual(connection.edges, [])
+        self.assertIsNone(connection.page_info.end_cursor)
+        self.assertTrue(connection.page_info.has_next_page)
+
+    def test_invalid_input(self):
+        cursors = [
+            "not a cursor",
+            base64.urlsafe_b64encode(b"[1]").decode(),
+            base64.urlsafe_b64encode(b"7").decode(),
+            encode_cursor("yesterday", 1),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor), self.assertRaisesMessage(Exception, "Invalid cursor"):
+                self.paginate("last_login", after=cursor)
+
+        with self.assertRaisesMessage(Exception, "Cannot sort by groups"):
+            self.paginate("groups")
+        with self.assertRaisesMessage(Exception, "first and last must be positive"):
+            self.paginate("email", first=-1)
+
+
+@override_settings(GRAPHQL_SLOW_OPERATION_MS=0)
+class MetricsTest(TestCase):
+    def setUp(self):
+        registry.reset()
+        self.addCleanup(registry.reset)
+
+    def test_operation_metrics(self):
+        view = csrf_exempt(GraphQLView.as_view(schema=schema, middleware=[MetricsMiddleware()]))
+        query = "query Nodes { nodes(first: 3) { id parent { id } } }"
+        request = RequestFactory().post("/graphql", json.dumps({"query": query, "operationName": "Nodes"}),
+                                        content_type="application/json")
+        # the view sets the CSRF cookie, which is stored in the session
+        request.session = self.client.session
+        with mock.patch("builtins.print") as print_mock:
+            self.assertEqual(view(request).status_code, 200)
+
+        metrics = registry.to_dict()
+        self.assertEqual(metrics["operations"]["Nodes"]["count"], 1)
+        self.assertEqual(metrics["operations"]["Nodes"]["queries"], 3)
+        self.assertEqual(metrics["resolvers"]["Nodes:nodes"]["queries"], 3)
+        self.assertEqual(metrics["resolvers"]["Nodes:nodes.parent"]["count"], 3)
+        # leaf fields without queries aren't recorded
+        self.assertNotIn("Nodes:nodes.id", metrics["resolvers"])
+        self.assertIn("SELECT 1", print_mock.call_args_list[-1][0][0])
+
+    def test_metrics_endpoint(self):
+        self.assertEqual(self.client.get("/graphql/metrics").status_code, 403)
+
+        user = User.objects.create(username="admin", email="admin@example.com", is_staff=True, is_superuser=True)
+        self.client.force_login(user)
+        response = self.client.get("/graphql/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("operations", response.json())
+
+
+class BenchmarkTest(TestCase):
+    def test_operations(self):
+        seed_benchmark_data(products=1, tasks=10, persons=3)
+
+        results = run_benchmark(iterations=1, warmup=0)
+
+        self.assertEqual(set(results), {operation["name"] for operation in OPERATIONS})
+
+    def test_compare_with_baseline(self):
+        baseline = {"tasklisting": {"p50_ms": 10, "p95_ms": 20, "queries": 3}}
+        results = {
+            "tasklisting": {"p50_ms": 11, "p95_ms": 25, "queries": 4},
+            "product": {"p50_ms": 1, "p95_ms": 2, "queries": 1},
+        }
+
+        self.assertEqual(compare_with_baseline(results, baseline, tolerance=0.5),
+                         ["tasklisting: 4 queries, baseline 3"])
+        self.assertEqual(len(compare_with_baseline(results, baseline, tolerance=0.2)), 2)
+
+
+class QueryBudgetTest(TestCase):
+    """Query counts of the benchmark operations against the budgets in api/query_budgets.json.
+    Run with UPDATE_QUERY_BUDGETS=1 to record the current queries as the new budgets."""
+
+    def test_query_budgets(self):
+        seed_benchmark_data(products=2, tasks=20, persons=5)
+
+        results = {}
+        for operation in OPERATIONS:
+            # the first replay fills the content type and other caches
+            capture_queries(self.client, operation)
+            results[operation["name"]] = capture_queries(self.client, operation)
+
+        budgets = load_query_budgets()
+        if os.environ.get("UPDATE_QUERY_BUDGETS"):
+            store_query_budgets(dict(budgets, **{name: get_query_budget(queries) for name, queries in results.items()}))
+            return
+
+        missing = [name for name in results if name not in budgets]
+        if missing:
+            self.fail(f"No query budget for {', '.join(missing)}, record them with UPDATE_QUERY_BUDGETS=1")
+
+        errors = [check_query_budget(name, queries, budgets[name]) for name, queries in results.items()]
+        errors = [error for error in errors if error]
+        if errors:
+            self.fail("\n\n".join(errors))
+
+    def test_check_query_budget(self):
+        budget = get_query_budget(["SELECT task", "SELECT product"])
+
+        self.assertIsNone(check_query_budget("task", ["SELECT task"], budget))
+        error = check_query_budget("task", ["SELECT task", "SELECT person", "SELECT product"], budget)
+        self.assertIn("task ran 3 queries, its budget is 2", error)
+        self.assertIn("+SELECT person", error)
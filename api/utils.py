@@ -1,4 +1,7 @@
+from collections import defaultdict
+
 from talent.models import Person, ProductPerson
+from work.models import Product
 from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
 from django.conf import settings
 
@@ -21,6 +24,7 @@ def get_current_user(info, input):
 
 
 def get_current_person(info, input_data=None):
+    """The person of the request, looked up once per request and user_id"""
     user = info.context.user
 
     if input_data:
@@ -30,41 +34,65 @@ def get_current_person(info, input_data=None):
     else:
         user_id = None
 
+    current_persons = getattr(info.context, "current_persons", None)
+    if current_persons is None:
+        current_persons = {}
+        info.context.current_persons = current_persons
+
+    key = (user.pk, user_id)
+    if key not in current_persons:
+        current_persons[key] = find_current_person(user, user_id)
+
+    return current_persons[key]
+
+
+def find_current_person(user, user_id):
     if user.is_anonymous and user_id and user_id != 0:
-        return Person.objects.filter(id=user_id).first()
+        return Person.objects.select_related("user").filter(id=user_id).first()
 
     if user.is_anonymous:
         return None
 
     try:
-        return Person.objects.get(user=user)
+        return Person.objects.select_related("user").get(user=user)
     except Person.DoesNotExist:
         return None
 
 
-def is_admin(user_id, product_slug):
-    if ProductPerson.objects.filter(
-            person_id=user_id,
-            product__slug=product_slug,
-            right__in=[ProductPerson.PERSON_TYPE_PRODUCT_ADMIN]
-    ).count() > 0:
-        return True
-    else:
-        return False
+def get_product_rights(person):
+    """Product id and slug -> set of the person's rights, loaded once per person instance.
+
+    The rights are cached on the instance, usually the current person of a request. Rights written after the first
+    check aren't seen through that instance, del person.product_rights to load them again.
+    """
+    product_rights = getattr(person, "product_rights", None)
+    if product_rights is None:
+        product_rights = defaultdict(set)
+        for product_id, slug, right in ProductPerson.objects \
+                .filter(person=person) \
+                .values_list("product_id", "product__slug", "right"):
+            product_rights[product_id].add(right)
+            product_rights[slug].add(right)
+        person.product_rights = product_rights
+
+    return product_rights
+
+
+def has_product_right(person, product, rights):
+    """product is a product instance, id or slug"""
+    key = product.id if isinstance(product, Product) else product
+    return bool(get_product_rights(person).get(key, set()) & set(rights))
+
+
+def is_admin(person, product_slug):
+    return has_product_right(person, product_slug, [ProductPerson.PERSON_TYPE_PRODUCT_ADMIN])
 
 
 def is_admin_or_manager(person, product_slug):
-    if ProductPerson.objects.filter(
-            person=person,
-            product__slug=product_slug,
-            right__in=[
-                ProductPerson.PERSON_TYPE_PRODUCT_ADMIN,
-                ProductPerson.PERSON_TYPE_PRODUCT_MANAGER
-            ]
-    ).count() > 0:
-        return True
-    else:
-        return False
+    return has_product_right(person, product_slug, [
+        ProductPerson.PERSON_TYPE_PRODUCT_ADMIN,
+        ProductPerson.PERSON_TYPE_PRODUCT_MANAGER
+    ])
 
 
 def get_paginator(query, page_size, page, paginated_type, **kwargs):
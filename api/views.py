@@ -0,0 +1,67 @@
+import json
+
+from django.db import connection
+from django.http import HttpResponse, HttpResponseForbidden
+from graphene_file_upload.django import FileUploadGraphQLView
+
+from api.metrics import OperationMetrics, registry
+
+
+class GraphQLView(FileUploadGraphQLView):
+    """GraphQL endpoint recording the metrics of every operation and adding the extensions of the
+    execution result (e.g. the query cost) to the response"""
+
+    def execute_graphql_request(self, request, data, query, variables, operation_name, show_graphiql=False):
+        if not query:
+            return super().execute_graphql_request(request, data, query, variables, operation_name, show_graphiql)
+
+        request.graphql_metrics = OperationMetrics(operation_name)
+        try:
+            with connection.execute_wrapper(request.graphql_metrics.record_query):
+                return super().execute_graphql_request(
+                    request, data, query, variables, operation_name, show_graphiql
+                )
+        finally:
+            request.graphql_metrics.finish()
+
+    def get_response(self, request, data, show_graphiql=False):
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+
+        execution_result = self.execute_graphql_request(
+            request, data, query, variables, operation_name, show_graphiql
+        )
+
+        if not execution_result:
+            return None, 200
+
+        status_code = 200
+        response = {}
+        if execution_result.errors:
+            response["errors"] = [self.format_error(e) for e in execution_result.errors]
+
+        if execution_result.invalid:
+            status_code = 400
+        else:
+            response["data"] = execution_result.data
+
+        if execution_result.extensions:
+            response["extensions"] = execution_result.extensions
+
+        if self.batch:
+            response["id"] = id
+            response["status"] = status_code
+
+        return self.json_encode(request, response, pretty=show_graphiql), status_code
+
+
+def get_graphql_metrics(request):
+    """Operation and resolver metrics of this worker as JSON, superusers only. POST resets them."""
+    user = request.user
+    if not (user.is_authenticated and user.is_staff and user.is_superuser):
+        return HttpResponseForbidden()
+
+    metrics = registry.to_dict()
+    if request.method == "POST":
+        registry.reset()
+
+    return HttpResponse(json.dumps(metrics), content_type="application/json")
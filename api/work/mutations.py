@@ -12,6 +12,7 @@ from git.views import create_webhook
 from api.utils import is_admin_or_manager, is_admin
 from api.mutations import InfoStatusMutation
 from .utils import set_depends
+from work.services import update_capability_tree
 from api.decorators import is_current_person
 from ..images.utils import upload_photo, upload_file
 from ..types import InfoType
@@ -84,7 +85,7 @@ class UpdateProductMutation(graphene.Mutation, InfoType):
     @is_current_person
     def mutate(current_person, info, *args, product_input, file=None):
         try:
-            if is_admin(current_person.id, product_input.slug):
+            if is_admin(current_person, product_input.slug):
                 product = Product.objects.get(slug=product_input.slug)
 
                 product.photo = upload_photo(file, 'products')
@@ -115,7 +116,7 @@ class DeleteProductMutation(graphene.Mutation, InfoType):
         try:
             product = Product.objects.get(slug=slug)
 
-            if is_admin(current_person.id, slug):
+            if is_admin(current_person, slug):
                 product.delete()
 
                 return DeleteProductMutation(status=True, message='Product successfully deleted')
@@ -250,6 +251,9 @@ class UpdateCapabilityTreeMutation(graphene.Mutation):
         tree = graphene.JSONString(required=True)
 
     status = graphene.Boolean()
+    created = graphene.List(graphene.Int)
+    moved = graphene.List(graphene.Int)
+    updated = graphene.List(graphene.Int)
 
     @staticmethod
     def transform_tree_item(tree_item):
@@ -274,9 +278,9 @@ class UpdateCapabilityTreeMutation(graphene.Mutation):
 
         node_id = Product.objects.get(slug=product_slug).capability_start_id
 
-        Capability.load_bulk(tree, parent=Capability.objects.get(pk=node_id), keep_ids=True)
+        changes = update_capability_tree(Capability.objects.get(pk=node_id), tree)
 
-        return UpdateCapabilityTreeMutation(status=True)
+        return UpdateCapabilityTreeMutation(status=True, **changes)
 
 
 class CreateInitiativeMutation(graphene.Mutation):
@@ -776,9 +780,6 @@ class InReviewTaskMutation(InfoStatusMutation, graphene.Mutation):
                 )
             # call task save event to update tasklisting model
             task.status = Task.TASK_STATUS_IN_REVIEW
-            task.save()
-            task_from_list = TaskListing.objects.get(task_id=task.id)
-            task_from_list.status = Task.TASK_STATUS_IN_REVIEW
             task.updated_at = datetime.now()
             task.save()
 
@@ -2,9 +2,12 @@ from api.work.inputs import TaskListInput, InitiativeListInput
 from .mutations import *
 from talent.models import ProductPerson
 from work.models import TaskListing
-from api.utils import logged_in_user, get_current_person
+from api.utils import logged_in_user, get_current_person, has_product_right
 
-from api.work.utils import get_tasks, get_tasks_by_product, get_task_category_listing, get_categories, get_expertises_listing
+from api.work.utils import get_tasks, get_tasks_by_product, get_task_category_listing, get_categories, \
+    get_expertises_listing, get_tasks_queryset, get_tasks_by_product_queryset, get_tasks_connection, \
+    get_visible_products, get_tasks_by_product_count
+from work.services import get_capability_breadcrumbs, get_capability_list, get_capability_tree
 from ..decorators import get_logged_person
 
 
@@ -18,22 +21,21 @@ class ProductQuery(ObjectType):
     def is_visible_for_person_filter(product, person):
         if not product.is_private:
             return True
-        else:
-            for product_person in ProductPerson.objects.filter(product=product, person=person):
-                if product_person.right in [
-                    ProductPerson.PERSON_TYPE_PRODUCT_ADMIN,
-                    ProductPerson.PERSON_TYPE_PRODUCT_MANAGER,
-                    ProductPerson.PERSON_TYPE_USER
-                ]:
-                    return True
 
-        return False
+        return has_product_right(person, product, [
+            ProductPerson.PERSON_TYPE_PRODUCT_ADMIN,
+            ProductPerson.PERSON_TYPE_PRODUCT_MANAGER,
+            ProductPerson.PERSON_TYPE_USER
+        ])
 
     @staticmethod
     @get_logged_person
     def resolve_product(current_person, info, *args, slug):
         try:
-            product = Product.objects.get(slug=slug)
+            product = Product.objects \
+                .select_related("owner__person__user", "owner__organisation") \
+                .prefetch_related("task_counters") \
+                .get(slug=slug)
 
             if not product.is_private:
                 return product
@@ -56,14 +58,9 @@ class ProductQuery(ObjectType):
         else:
             products = Product.objects.all()
 
-        if current_person:
-            products = list(
-                filter(lambda product: ProductQuery.is_visible_for_person_filter(product, current_person), products)
-            )
-        else:
-            products = products.filter(is_private=False)
-
-        return products
+        return get_visible_products(products, current_person) \
+            .select_related("owner__person__user", "owner__organisation") \
+            .prefetch_related("task_counters")
 
     @staticmethod
     def resolve_user_person(self, info, **kwargs):
@@ -119,9 +116,7 @@ class CapabilityQuery(ObjectType):
             product_slug = kwargs.get('product_slug')
 
             if product_slug is not None:
-                node_id = Product.objects.get(slug=product_slug).capability_start_id
-
-                return Capability.dump_bulk(parent=Capability.objects.get(pk=node_id))
+                return get_capability_tree(Product.objects.get(slug=product_slug))["tree"]
             else:
                 return None
         except Exception as e:
@@ -134,10 +129,7 @@ class CapabilityQuery(ObjectType):
             product_slug = kwargs.get('product_slug')
 
             if product_slug is not None:
-                node_id = Product.objects.get(slug=product_slug).capability_start_id
-
-                # Return all capabilities of product and cut root node
-                return Capability.get_tree(parent=Capability.objects.get(pk=node_id))[1:]
+                return get_capability_list(Product.objects.get(slug=product_slug))
             else:
                 return None
         except Exception as e:
@@ -150,27 +142,7 @@ class CapabilityQuery(ObjectType):
             node_id = kwargs.get('node_id')
 
             if node_id is not None:
-                parent_crumbs = Capability.objects.get(pk=node_id).get_ancestors()[1:]
-                parent_crumbs_with_siblings = []
-
-                for crumb in parent_crumbs:
-                    siblings = crumb.get_siblings()
-                    formatted_siblings = []
-
-                    for sibling in siblings:
-                        if sibling.id != crumb.id:
-                            formatted_siblings.append({
-                                'id': sibling.id,
-                                'name': sibling.name,
-                            })
-
-                    parent_crumbs_with_siblings.append({
-                        'id': crumb.id,
-                        'name': crumb.name,
-                        'siblings': formatted_siblings
-                    })
-
-                return parent_crumbs_with_siblings
+                return get_capability_breadcrumbs(Capability.objects.get(pk=node_id))
             else:
                 return None
         except:
@@ -210,7 +182,7 @@ class InitiativeQuery(ObjectType):
         if status:
             filtered_data["status"] = status
 
-        initiatives = Initiative.get_filtered_data(input_data, filtered_data)
+        initiatives = Initiative.get_filtered_data(input_data, filtered_data).prefetch_related("task_counters")
 
         return initiatives
 
@@ -250,6 +222,17 @@ class TaskQuery(ObjectType):
         input=TaskListInput()
     )
 
+    tasks_connection = graphene.relay.ConnectionField(TaskConnection, input=TaskListInput())
+
+    tasklisting_connection = graphene.relay.ConnectionField(TaskListingConnection, input=TaskListInput())
+
+    tasklisting_by_product_connection = graphene.relay.ConnectionField(
+        TaskListingConnection,
+        product_slug=graphene.String(required=False),
+        review_id=graphene.Int(required=False),
+        input=TaskListInput()
+    )
+
     task = graphene.Field(TaskType, published_id=graphene.Int(), product_slug=graphene.String())
     status_list = graphene.List(graphene.String)
 
@@ -257,6 +240,22 @@ class TaskQuery(ObjectType):
     def resolve_tasklisting(root, info, **kwargs):
         return get_tasks(TaskListing, info, kwargs)
 
+    @staticmethod
+    def resolve_tasks_connection(root, info, **kwargs):
+        return get_tasks_connection(get_tasks_queryset(Task, info, kwargs), TaskConnection, kwargs)
+
+    @staticmethod
+    def resolve_tasklisting_connection(root, info, **kwargs):
+        return get_tasks_connection(get_tasks_queryset(TaskListing, info, kwargs), TaskListingConnection, kwargs)
+
+    @staticmethod
+    def resolve_tasklisting_by_product_connection(root, info, **kwargs):
+        task_queryset = get_tasks_by_product_queryset(TaskListing, info, kwargs)
+        if task_queryset is None:
+            task_queryset = TaskListing.objects.none()
+
+        return get_tasks_connection(task_queryset, TaskListingConnection, kwargs)
+
     @staticmethod
     def resolve_tasks(root, info, **kwargs):
         return get_tasks(Task, info, kwargs)
@@ -275,7 +274,7 @@ class TaskQuery(ObjectType):
 
     @staticmethod
     def resolve_tasklisting_by_product_count(self, info, **kwargs):
-        return get_tasks_by_product(TaskListing, info, kwargs, True)
+        return get_tasks_by_product_count(info, kwargs)
 
     @staticmethod
     def resolve_task(*args, **kwargs):
@@ -1,12 +1,12 @@
-from django.db.models import Q
 import graphene
 from graphene_django.types import DjangoObjectType, ObjectType
+from api.loaders import get_loaders
+from api.pagination import CountableConnection
 from api.talent.types import PersonType
-from api.utils import get_current_person
+from api.utils import get_current_person, has_product_right
 from api.work.utils import get_right_task_status, get_video_link
 from matching.models import CLAIM_TYPE_IN_REVIEW
 from work.models import *
-from talent.models import ProductPerson
 
 
 class ExpertiseType(DjangoObjectType):
@@ -17,6 +17,11 @@ class TaskCategoryType(DjangoObjectType):
     class Meta:
         model = TaskCategory
 
+
+def has_active_depends(depends):
+    return any(task.status != Task.TASK_STATUS_DONE for task in depends)
+
+
 class TaskType(DjangoObjectType):
     id = graphene.Int()
     product = graphene.Field(lambda: ProductType)
@@ -40,18 +45,20 @@ class TaskType(DjangoObjectType):
     def resolve_task_category(self, _):
         return self.category if self.category else None
 
-    def resolve_task_expertise(self, _):
-        if self.expertise.count():
-            return self.expertise.all()
-        else:
-            return None
+    def resolve_task_expertise(self, info):
+        return get_loaders(info).task_expertise.load(self.id).then(lambda expertise: expertise or None)
+
+    def resolve_assigned_to(self, info):
+        def get_assignee(claims):
+            active_claims = [claim for claim in claims if claim.kind in [0, 1]]
+            return active_claims[-1].person if active_claims else None
 
-    def resolve_assigned_to(self, _):
-        task_claim = self.taskclaim_set.filter(kind__in=[0, 1]).last()
-        return task_claim.person if task_claim else None
+        return get_loaders(info).task_claims.load(self.id).then(get_assignee)
 
-    def resolve_in_review(self, _):
-        return self.taskclaim_set.filter(kind=CLAIM_TYPE_IN_REVIEW).count() > 0
+    def resolve_in_review(self, info):
+        return get_loaders(info).task_claims.load(self.id).then(
+            lambda claims: any(claim.kind == CLAIM_TYPE_IN_REVIEW for claim in claims)
+        )
 
     def resolve_priority(self, _):
         try:
@@ -59,42 +66,33 @@ class TaskType(DjangoObjectType):
         except:
             return None
 
-    def resolve_can_edit(self, _, **kwargs):
-        current_person = get_current_person(_, kwargs)
-        try:
-            if not current_person:
-                return False
-
-            return ProductPerson.objects.filter(
-                product=ProductTask.objects.get(task_id=self.id).product,
-                person=current_person,
-                right__in=[1, 2, 4]
-            ).exists()
-        except (ProductPerson.DoesNotExist, ProductTask.DoesNotExist):
+    def resolve_can_edit(self, info, **kwargs):
+        current_person = get_current_person(info, kwargs)
+        if not current_person:
             return False
 
-    def resolve_depend_on(self, _, **kwargs):
-        try:
-            return Task.objects.filter(taskdepend__task=self.id)
-        except Task.DoesNotExist:
-            return None
+        return get_loaders(info).task_product.load(self.id).then(
+            lambda product: bool(product) and has_product_right(current_person, product, [1, 2, 4])
+        )
 
-    def resolve_has_active_depends(self, info):
-        return Task.objects.filter(taskdepend__task=self.id).exclude(status=Task.TASK_STATUS_DONE).exists()
+    def resolve_depend_on(self, info, **kwargs):
+        return get_loaders(info).task_depends_on.load(self.id)
 
-    def resolve_relatives(self, _, **kwargs):
-        try:
-            relatives = list(map(lambda relative: relative.task_id, TaskDepend.objects.filter(depends_by=self.id)))
+    def resolve_has_active_depends(self, info):
+        return get_loaders(info).task_depends_on.load(self.id).then(has_active_depends)
 
-            return Task.objects.filter(pk__in=relatives)
-        except Task.DoesNotExist:
-            return None
+    def resolve_relatives(self, info, **kwargs):
+        return get_loaders(info).task_relatives.load(self.id)
 
-    def resolve_status(self, _, **kwargs):
-        return get_right_task_status(self.id, self)
+    def resolve_status(self, info, **kwargs):
+        return get_loaders(info).task_depends_on.load(self.id).then(
+            lambda depends: get_right_task_status(self.id, self, has_active_depends(depends))
+        )
 
-    def resolve_link(self, _):
-        return self.get_task_link(False)
+    def resolve_link(self, info):
+        return get_loaders(info).task_product.load(self.id).then(
+            lambda product: self.get_task_link(False, product=product) if product else None
+        )
 
     def resolve_preview_video_url(self, _):
         return get_video_link(self, "video_url")
@@ -161,8 +159,12 @@ class InitiativeInput(graphene.InputObjectType):
 
 
 class ProductType(DjangoObjectType):
-    available_task_num = graphene.Int()
-    total_task_num = graphene.Int()
+    available_task_num = graphene.Int(
+        description="Available tasks of the product, with or without an initiative"
+    )
+    total_task_num = graphene.Int(
+        description="Tasks of the product in any status, with or without an initiative or capability"
+    )
     initiative_set = graphene.List(InitiativeType)
     owner = graphene.String()
 
@@ -170,17 +172,13 @@ class ProductType(DjangoObjectType):
         model = Product
 
     def resolve_available_task_num(self, _):
-        return Task.objects.filter(initiative__product=self, status=2).count()
+        return get_task_counts(self).get(Task.TASK_STATUS_AVAILABLE, (0, 0))[0]
 
     def resolve_total_task_num(self, _):
-        if self is not None:
-            return Task.objects.filter(
-                Q(capability__product=self) | Q(initiative__product=self)
-            ).count()
-        return None
+        return sum(count for count, _ in get_task_counts(self).values())
 
     def resolve_initiative_set(self,_):
-        return Initiative.objects.filter(product=self.id,status=1)
+        return Initiative.objects.filter(product=self.id,status=1).prefetch_related("task_counters")
         
     def resolve_owner(self, _):
         return self.owner.get_username() if self.owner else None
@@ -340,10 +338,12 @@ class TaskListingType(DjangoObjectType):
         return self.product_data
 
     def resolve_category(self, info):
-        return self.task.category if self.task.category else None
+        return self.category_name
 
     def resolve_expertise(self, info):
-        return self.task.expertise if self.task.category else None
+        if not self.category_id or not self.expertise_data:
+            return None
+        return ", ".join(expertise["name"] for expertise in self.expertise_data)
 
     def resolve_priority(self, _):
         try:
@@ -353,3 +353,13 @@ class TaskListingType(DjangoObjectType):
 
     def resolve_video_url(self, _):
         return get_video_link(self, "video_url")
+
+
+class TaskConnection(CountableConnection):
+    class Meta:
+        node = TaskType
+
+
+class TaskListingConnection(CountableConnection):
+    class Meta:
+        node = TaskListingType
@@ -1,7 +1,9 @@
 import graphene_django_optimizer as gql_optimizer
+from django.db.models import Exists, OuterRef, Q
+from api.pagination import paginate_keyset
 from api.utils import get_current_person
-from talent.models import Review
-from work.models import TaskDepend, Task, Product
+from talent.models import ProductPerson, Review
+from work.models import TaskDepend, Task, Product, TaskListing, get_task_counts
 from .serializers import TaskCategorySerializer, ExpertiseSerializer
 
 
@@ -16,11 +18,12 @@ def set_depends(depends, task_id):
             new_task_depend.save()
 
 
-def get_right_task_status(task_id, task=None):
-    depends_on_tasks = Task.objects. \
-        filter(taskdepend__task=task_id). \
-        exclude(status=Task.TASK_STATUS_DONE).exists()
-    if depends_on_tasks:
+def get_right_task_status(task_id, task=None, has_active_depends=None):
+    if has_active_depends is None:
+        has_active_depends = Task.objects. \
+            filter(taskdepend__task=task_id). \
+            exclude(status=Task.TASK_STATUS_DONE).exists()
+    if has_active_depends:
         return Task.TASK_STATUS_BLOCKED
 
     if not task:
@@ -32,7 +35,25 @@ def get_right_task_status(task_id, task=None):
     return task.status
 
 
-def get_tasks(task_model, info, kwargs):
+def get_visible_products(products, person):
+    """Public products and the private ones the person is a member of, as a single queryset"""
+    if not person:
+        return products.filter(is_private=False)
+
+    return products.annotate(
+        is_member=Exists(ProductPerson.objects.filter(
+            product=OuterRef("pk"),
+            person=person,
+            right__in=[
+                ProductPerson.PERSON_TYPE_PRODUCT_ADMIN,
+                ProductPerson.PERSON_TYPE_PRODUCT_MANAGER,
+                ProductPerson.PERSON_TYPE_USER
+            ]
+        ))
+    ).filter(Q(is_private=False) | Q(is_member=True))
+
+
+def get_tasks_queryset(task_model, info, kwargs):
     input_data = kwargs.get('input')
     exclude_data = None
 
@@ -40,12 +61,22 @@ def get_tasks(task_model, info, kwargs):
     # if not current_person:
     exclude_data = {"status__in": [0, 1, 5]}
 
-    return gql_optimizer.query(task_model.get_filtered_data(input_data, exclude_data=exclude_data), info)
+    return task_model.get_filtered_data(input_data, exclude_data=exclude_data)
 
 
-def get_tasks_by_product(task_model, info, kwargs, only_count=False):
+def get_tasks(task_model, info, kwargs):
+    return gql_optimizer.query(get_tasks_queryset(task_model, info, kwargs), info)
+
+
+def get_product_id(kwargs):
+    review_id = kwargs.get('review_id')
+    if review_id is not None:
+        return Review.objects.get(pk=review_id).product_id
+    return Product.objects.get(slug=kwargs.get('product_slug')).id
+
+
+def get_tasks_by_product_queryset(task_model, info, kwargs):
     try:
-        review_id = kwargs.get('review_id')
         input_data = kwargs.get('input')
         exclude_data = None
 
@@ -53,10 +84,7 @@ def get_tasks_by_product(task_model, info, kwargs, only_count=False):
         if not current_person:
             exclude_data = {"status__in": [0, 1, 5]}
 
-        if review_id is not None:
-            product_id = Review.objects.get(pk=review_id).product_id
-        else:
-            product_id = Product.objects.get(slug=kwargs.get('product_slug')).id
+        product_id = get_product_id(kwargs)
 
         product_param_name = "producttask__product" \
             if task_model.__name__ == Task.__name__ else "product_id"
@@ -66,15 +94,71 @@ def get_tasks_by_product(task_model, info, kwargs, only_count=False):
             "blocked": False
         }
 
-        task_queryset = task_model.get_filtered_data(input_data, filter_data, exclude_data)
+        return task_model.get_filtered_data(input_data, filter_data, exclude_data)
+    except Product.DoesNotExist:
+        return None
+
+
+def get_tasks_by_product(task_model, info, kwargs, only_count=False):
+    task_queryset = get_tasks_by_product_queryset(task_model, info, kwargs)
+    if task_queryset is None:
+        return None
+
+    if only_count:
+        return task_queryset.count()
 
-        if only_count:
-            return task_queryset.count()
+    return gql_optimizer.query(task_queryset, info)
 
-        return gql_optimizer.query(task_queryset, info)
+
+def get_tasks_by_product_count(info, kwargs):
+    """Number of listed tasks of a product, read from the task counters when they match the listing filter.
+
+    The counters don't know which tasks have active depends, so listings of available tasks are counted from the
+    listing table like every other filter.
+    """
+    input_data = kwargs.get('input') or {}
+    statuses = set(input_data.get("statuses") or [])
+    if Task.TASK_STATUS_AVAILABLE in statuses or \
+            any(value for key, value in input_data.items() if key not in ("statuses", "sorted_by")):
+        return get_tasks_by_product(TaskListing, info, kwargs, True)
+
+    try:
+        products = Product.objects.prefetch_related("task_counters")
+        if kwargs.get("review_id") is not None:
+            product = products.get(pk=get_product_id(kwargs))
+        else:
+            # a single product query, the listing next to the count looks its product up on its own
+            product = products.get(slug=kwargs.get("product_slug"))
     except Product.DoesNotExist:
         return None
 
+    # tasks of private products aren't listed
+    if product.is_private:
+        return 0
+
+    statuses = statuses or {status for status, _ in Task.TASK_STATUS}
+    if not get_current_person(info, kwargs):
+        statuses -= {0, 1, 5}
+
+    return sum(
+        count - blocked_count
+        for status, (count, blocked_count) in get_task_counts(product).items()
+        if status in statuses
+    )
+
+
+def get_tasks_connection(task_queryset, connection_type, kwargs):
+    input_data = kwargs.get('input') or {}
+    return paginate_keyset(
+        task_queryset,
+        connection_type,
+        sorted_by=input_data.get("sorted_by") or "title",
+        first=kwargs.get("first"),
+        after=kwargs.get("after"),
+        last=kwargs.get("last"),
+        before=kwargs.get("before"),
+    )
+
 
 def get_video_link(obj, link_attr_name):
     video_link = getattr(obj, link_attr_name)
@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.db import connections
+
+
+def check_connection(connection, now):
+    """Closes a persistent connection that was idle for CONN_HEALTH_CHECK_IDLE seconds and doesn't respond
+    anymore, the next query opens a new one"""
+    idle_since = getattr(connection, "idle_since", None)
+    if settings.CONN_HEALTH_CHECK_IDLE is None or idle_since is None or connection.connection is None:
+        return
+
+    if now - idle_since >= settings.CONN_HEALTH_CHECK_IDLE and not connection.is_usable():
+        connection.close()
+
+
+class ConnectionHealthCheckMiddleware:
+    """Replaces persistent database connections that were dropped while they were idle, e.g. by a database
+    or pgbouncer restart, so the request doesn't fail on its first query. Connections used within the last
+    CONN_HEALTH_CHECK_IDLE seconds skip the check and its round trip."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        now = time.monotonic()
+        for connection in connections.all():
+            check_connection(connection, now)
+
+        try:
+            return self.get_response(request)
+        finally:
+            now = time.monotonic()
+            for connection in connections.all():
+                connection.idle_since = now
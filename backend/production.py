@@ -24,8 +24,9 @@ ALLOWED_HOSTS = env.list("DJANGO_ALLOWED_HOSTS", default=["open-united-backend.h
 
 # DATABASES
 # ------------------------------------------------------------------------------
-DATABASES["default"]["ATOMIC_REQUESTS"] = True  # noqa F405
-DATABASES["default"]["CONN_MAX_AGE"] = env.int("CONN_MAX_AGE", default=60)  # noqa F405
+# mutations run in a transaction each (api.middleware.MutationTransactionMiddleware), queries in autocommit
+DATABASES["default"]["CONN_MAX_AGE"] = env.int("CONN_MAX_AGE", default=600)  # noqa F405
+DATABASES["default"]["DISABLE_SERVER_SIDE_CURSORS"] = env.bool("DATABASE_PGBOUNCER", default=False)  # noqa F405
 
 # SECURITY
 # ------------------------------------------------------------------------------
@@ -1,3 +1,4 @@
+import mimetypes
 import os
 from pathlib import Path
 
@@ -13,8 +14,9 @@ s3 = boto3.resource('s3')
 
 
 def put_file_to_bucket(file_name, data, subdir):
+    content_type = mimetypes.guess_type(file_name)[0] or 'application/octet-stream'
     file_name = f'{subdir}/{file_name}'
-    res = s3.Bucket(bucket_name).put_object(Key=file_name, Body=data)
+    res = s3.Bucket(bucket_name).put_object(Key=file_name, Body=data, ContentType=content_type)
 
     return res.__dict__
 
@@ -34,3 +36,17 @@ def get_file_from_bucket(file_name, subdir):
     obj = s3.Object(bucket_name, file_name)
 
     return obj.get()['Body']
+
+
+def get_file_object(file_name, subdir, if_none_match=None, byte_range=None):
+    """GetObject response of the file with a streaming Body.
+
+    Raises ClientError with code NoSuchKey, 304 when if_none_match matches or InvalidRange.
+    """
+    kwargs = dict(Bucket=bucket_name, Key=f'{subdir}/{file_name}')
+    if if_none_match:
+        kwargs['IfNoneMatch'] = if_none_match
+    if byte_range:
+        kwargs['Range'] = byte_range
+
+    return s3.meta.client.get_object(**kwargs)
@@ -1,4 +1,8 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 
 from users.models import User
 from api.auth.authmachine_client import AuthMachineClient
@@ -10,6 +14,7 @@ def get_person_available_slug(person_input, slug_increment):
     return person_input["username"] + ("" if slug_increment == 0 else f"-{slug_increment}")
 
 
+@transaction.atomic
 def sign_up(person_input, slug_increment):
     available_slug = get_person_available_slug(person_input, slug_increment)
     is_exists_person_by_username = Person.objects.filter(user__username=available_slug).exists()
@@ -103,35 +108,64 @@ def get_permission_value(perm_name):
     return permissions.get(perm_name, None)
 
 
-def update_user_permissions(request, user, provider_user_id):
+def update_user_permissions(request, user, provider_user_id, force=False):
+    """Sync the person's product rights with AuthMachine.
+
+    Logins within AUTHMACHINE_PERMISSIONS_SYNC_INTERVAL of the last sync skip the remote call. Products missing from
+    the response have no rights left, only the changed rows are inserted or deleted.
+    """
+    person = Person.objects.filter(user=user).first()
+    now = timezone.now()
+    if not force and person and person.permissions_synced_at and \
+            now - person.permissions_synced_at < timedelta(seconds=settings.AUTHMACHINE_PERMISSIONS_SYNC_INTERVAL):
+        return
+
+    products = dict(Product.objects.values_list("slug", "id"))
     client = AuthMachineClient(request)
-    permission_data = client.get_permissions(user_id=provider_user_id,
-                                             objects=Product.objects.all().values_list("slug", flat=True))
-    is_superuser = permission_data.get("is_superuser", False)
-    permissions = permission_data.get("permissions", [])
-    user.is_superuser = is_superuser
-    user.save()
+    permission_data = client.get_permissions(user_id=provider_user_id, objects=list(products.keys()))
+    # a failed request returns no data, the rights are kept and the next login retries it
+    if not permission_data:
+        return
 
-    try:
-        person = Person.objects.get(user=user)
-        for index, perm_name in enumerate(permissions):
-            permission_list = permissions[perm_name]
-            product = Product.objects.get(slug=perm_name)
-            # remove all permission
-            person.productperson_set.filter(product=product).all().delete()
-            # update permissions list
-            if permission_list:
-                permissions_queryset = list()
-                for m in permission_list:
-                    perm_right = get_permission_value(m.replace("_", ""))
-                    if perm_right:
-                        permissions_queryset.append(
-                            ProductPerson(
-                                person=person,
-                                product=product,
-                                right=perm_right
-                            )
-                        )
-                ProductPerson.objects.bulk_create(permissions_queryset)
-    except (Person.DoesNotExist, Product.DoesNotExist) as e:
-        print("Exception: ", e, flush=True)
+    is_superuser = permission_data.get("is_superuser", False)
+    permissions = permission_data.get("permissions", {})
+    if user.is_superuser != is_superuser:
+        user.is_superuser = is_superuser
+        user.save(update_fields=["is_superuser"])
+
+    if not person:
+        print("Exception: ", f"Person of user {user.id} does not exist", flush=True)
+        return
+
+    rights = set()
+    for slug, permission_list in permissions.items():
+        product_id = products.get(slug)
+        if product_id is None:
+            print("Exception: ", f"Product {slug} does not exist", flush=True)
+            continue
+
+        for permission in permission_list or []:
+            right = get_permission_value(permission.replace("_", ""))
+            if right:
+                rights.add((product_id, right))
+
+    with transaction.atomic():
+        stale_ids = []
+        current_rights = set()
+        for product_person in ProductPerson.objects.filter(person=person, product_id__in=products.values()):
+            key = (product_person.product_id, product_person.right)
+            if key in rights and key not in current_rights:
+                current_rights.add(key)
+            else:
+                stale_ids.append(product_person.id)
+
+        if stale_ids:
+            ProductPerson.objects.filter(id__in=stale_ids).delete()
+        new_rights = rights - current_rights
+        if new_rights:
+            ProductPerson.objects.bulk_create([
+                ProductPerson(person=person, product_id=product_id, right=right)
+                for product_id, right in sorted(new_rights)
+            ])
+
+        Person.objects.filter(pk=person.pk).update(permissions_synced_at=now)
@@ -75,6 +75,7 @@ INSTALLED_APPS = [
     'ideas_bugs',
     'pages',
     'contribution_management',
+    'emails',
 
     'core_utils',
 
@@ -82,10 +83,21 @@ INSTALLED_APPS = [
 
 GRAPHENE = {
     "RELAY_CONNECTION_ENFORCE_FIRST_OR_LAST": True,
-    "RELAY_CONNECTION_MAX_LIMIT": 100
+    "RELAY_CONNECTION_MAX_LIMIT": 100,
+    "MIDDLEWARE": ["api.metrics.MetricsMiddleware", "api.middleware.MutationTransactionMiddleware"],
 }
 
+# operations deeper or costlier than this are rejected before they run, see api/cost.py
+GRAPHQL_MAX_DEPTH = int(os.environ.get('GRAPHQL_MAX_DEPTH', 12))
+GRAPHQL_MAX_COST = int(os.environ.get('GRAPHQL_MAX_COST', 50000))
+# items assumed for list fields without a first/last argument
+GRAPHQL_DEFAULT_LIST_SIZE = 20
+# operations slower than this (ms) are logged with their slowest queries, empty disables the log
+GRAPHQL_SLOW_OPERATION_MS = int(os.environ['GRAPHQL_SLOW_OPERATION_MS']) if os.environ.get('GRAPHQL_SLOW_OPERATION_MS') \
+    else None
+
 MIDDLEWARE = [
+    'backend.middleware.ConnectionHealthCheckMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -141,9 +153,16 @@ else:
             'PASSWORD': os.environ.get('POSTGRES_PASSWORD', 'mypass'),
             'HOST': os.environ.get('POSTGRES_HOST', 'postgres'),
             'PORT': os.environ.get('POSTGRES_POST', '5432'),
+            # seconds a connection is kept open for the next requests, 0 closes it after every request
+            'CONN_MAX_AGE': int(os.environ.get('CONN_MAX_AGE', 0)),
+            # pgbouncer in transaction pooling mode can't keep server side cursors across transactions
+            'DISABLE_SERVER_SIDE_CURSORS': strtobool(os.environ.get('DATABASE_PGBOUNCER', '0')),
         }
     }
 
+# persistent connections idle for this many seconds are checked before they're reused, see backend/middleware.py
+CONN_HEALTH_CHECK_IDLE = int(os.environ.get('CONN_HEALTH_CHECK_IDLE', 30))
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 
@@ -237,6 +256,13 @@ AUTHMACHINE_CLIENT_ID = os.environ.get('AUTHMACHINE_CLIENT_ID', '')
 AUTHMACHINE_CLIENT_SECRET = os.environ.get('AUTHMACHINE_CLIENT_SECRET', '')
 AUTHMACHINE_API_TOKEN = os.environ.get('AUTHMACHINE_API_TOKEN', '')
 AUTHMACHINE_SCOPE = 'openid email profile'
+# seconds the discovered provider configuration is reused before it's fetched again
+AUTHMACHINE_PROVIDER_CONFIG_TTL = int(os.environ.get('AUTHMACHINE_PROVIDER_CONFIG_TTL', 60 * 60))
+# seconds to keep using the previous configuration after a failed refresh
+AUTHMACHINE_PROVIDER_CONFIG_RETRY = 60
+AUTHMACHINE_TIMEOUT = 20
+# product rights are synced with AuthMachine on login at most once per interval (seconds)
+AUTHMACHINE_PERMISSIONS_SYNC_INTERVAL = int(os.environ.get('AUTHMACHINE_PERMISSIONS_SYNC_INTERVAL', 15 * 60))
 
 UID_MAX_LENGTH = 191
 
@@ -253,3 +279,30 @@ LICENSE_PUB_KEY = os.environ.get('LICENSE_PUB_KEY', '.license_key.pub')
 
 FAKE_LOGIN_USER_ID = os.environ.get('FAKE_LOGIN_USER_ID', None)
 
+# TaskListing rows are rebuilt by `manage.py process_task_listings`,
+# set to 0 to rebuild them right after each commit instead (no worker needed)
+TASK_LISTING_ASYNC = strtobool(os.environ.get('TASK_LISTING_ASYNC', '1'))
+
+# capability tree snapshots are keyed by the tree version, so the timeout only bounds memory use
+CAPABILITY_TREE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# images are streamed from S3 in chunks of this size (bytes)
+IMAGE_CHUNK_SIZE = 64 * 1024
+# uploaded file names are unique, so browsers may keep them for a long time
+IMAGE_CACHE_MAX_AGE = 60 * 60 * 24 * 7
+# directory of the local disk cache of images, empty disables it
+IMAGE_CACHE_DIR = os.environ.get('IMAGE_CACHE_DIR', '')
+IMAGE_CACHE_SIZE = int(os.environ.get('IMAGE_CACHE_SIZE', 256 * 1024 * 1024))
+IMAGE_CACHE_MAX_FILE_SIZE = 5 * 1024 * 1024
+
+# how many levels of replies a comment thread page may embed, deeper ones are loaded by parent id
+COMMENT_THREAD_MAX_DEPTH = 3
+
+# emails are queued in OutboundEmail and sent by `manage.py process_outbound_emails` through this backend,
+# emails.backends.DjangoMailBackend sends them with EMAIL_BACKEND (console, file, SMTP) instead of SendGrid
+OUTBOUND_EMAIL_BACKEND = os.environ.get('OUTBOUND_EMAIL_BACKEND', 'emails.backends.SendGridBackend')
+OUTBOUND_EMAIL_MAX_ATTEMPTS = 5
+# seconds before the first retry, doubled on every failed attempt
+OUTBOUND_EMAIL_RETRY_DELAY = 60
+OUTBOUND_EMAIL_MAX_RETRY_DELAY = 60 * 60
+
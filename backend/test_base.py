@@ -1,6 +1,12 @@
-from test_plus.test import TestCase as PlusTestCase
+from django.test import TransactionTestCase as DjangoTransactionTestCase
+from test_plus.test import BaseTestCase, TestCase as PlusTestCase
 
 
 class TestCase(PlusTestCase):
 
     pass
+
+
+class TransactionTestCase(DjangoTransactionTestCase, BaseTestCase):
+
+    pass
@@ -49,5 +49,7 @@ EMAIL_PORT = 1025
 
 # Your stuff...
 # ------------------------------------------------------------------------------
+TASK_LISTING_ASYNC = False
+OUTBOUND_EMAIL_BACKEND = "emails.backends.DjangoMailBackend"
 
 DEPLOYMENT = env("test", default="staging")
@@ -0,0 +1,32 @@
+import time
+from unittest import mock
+
+from django.db import connection
+from django.test import override_settings
+
+from backend.middleware import check_connection
+from backend.test_base import TestCase
+
+
+@override_settings(CONN_HEALTH_CHECK_IDLE=30)
+class ConnectionHealthCheckTest(TestCase):
+    def check(self, idle, usable):
+        connection.ensure_connection()
+        now = time.monotonic()
+        connection.idle_since = now - idle
+        self.addCleanup(delattr, connection, "idle_since")
+
+        with mock.patch.object(connection, "is_usable", return_value=usable) as is_usable, \
+                mock.patch.object(connection, "close") as close:
+            check_connection(connection, now)
+        return is_usable.called, close.called
+
+    def test_unusable_idle_connection(self):
+        self.assertEqual(self.check(idle=60, usable=False), (True, True))
+
+    def test_usable_idle_connection(self):
+        self.assertEqual(self.check(idle=60, usable=True), (True, False))
+
+    def test_recently_used_connection(self):
+        # busy connections skip the check and its round trip
+        self.assertEqual(self.check(idle=5, usable=False), (False, False))
@@ -3,10 +3,12 @@ from django.conf.urls.static import static
 from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
-from graphene_file_upload.django import FileUploadGraphQLView
+from api.cost import QueryCostBackend
 from api.schema import schema
+from api.views import GraphQLView, get_graphql_metrics
 from django.views.decorators.csrf import csrf_exempt
 from backend import views
+from work.views import get_capability_tree_json
 
 
 urlpatterns = []
@@ -20,11 +22,13 @@ if ADMIN_PATH:
 
 
 urlpatterns += [
-    path("graphql", csrf_exempt(FileUploadGraphQLView.as_view(schema=schema, graphiql=False)), name="api"),
+    path("graphql", csrf_exempt(GraphQLView.as_view(schema=schema, graphiql=False, backend=QueryCostBackend())), name="api"),
+    path("graphql/metrics", csrf_exempt(get_graphql_metrics), name="graphql-metrics"),
     path("github/", include("git.urls")),
     path("oidc-callback", views.OIDCallbackView.as_view(), name="oidc-callback"),
     path("oidc-logout-callback", views.OIDCallbackLogoutView.as_view(), name="auth-logout-callback"),
     path('images/', include('images.urls'), name='images'),
+    path("capabilities/<slug:product_slug>", get_capability_tree_json, name="capability-tree"),
     path('summernote/', include('django_summernote.urls')),
 ] + static(
     settings.MEDIA_URL,
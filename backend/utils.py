@@ -1,23 +1,14 @@
-import os
-from django.conf import settings
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+from emails.services import queue_email
 
 
-def send_email(to_emails, subject, content):
-    try:
-        message = Mail(
-            from_email=settings.EMAIL_HOST,
-            to_emails=to_emails,
-            subject=subject,
-            html_content=content
-        )
+def send_email(to_emails, subject, content, is_multiple=False):
+    """Queue an email for the process_outbound_emails worker, it is only sent if the current transaction commits.
 
-        if not settings.DEBUG:
-            sg = SendGridAPIClient(os.environ.get('SENDGRID_API_KEY'))
-            sg.send(message)
-        else:
-            print("Email sent:", flush=True)
-            print(message, flush=True)
-    except Exception as e:
-        print("Send Grid Email Failed:", e, flush=True)
+    is_multiple sends a separate message to every recipient, so they don't see each other.
+    """
+    if isinstance(to_emails, str):
+        to_emails = [to_emails]
+
+    to_emails = [email for email in to_emails if email]
+    if to_emails:
+        queue_email(to_emails, subject, content, is_multiple)
@@ -0,0 +1,29 @@
+# Generated by Django 3.1 on 2026-10-18 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0022_user_model'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bugcomment',
+            index=models.Index(fields=['depth', 'path'], name='bugcomment_dpath_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='capabilitycomment',
+            index=models.Index(fields=['depth', 'path'], name='capabilitycomment_dpath_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ideacomment',
+            index=models.Index(fields=['depth', 'path'], name='ideacomment_dpath_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskcomment',
+            index=models.Index(fields=['depth', 'path'], name='taskcomment_dpath_idx'),
+        ),
+    ]
@@ -9,6 +9,10 @@ class Comment(MP_Node):
 
     class Meta:
         abstract = True
+        indexes = [
+            # one level of a thread in path order, see api.comments.utils.get_comment_thread
+            models.Index(fields=["depth", "path"], name="%(class)s_dpath_idx"),
+        ]
 
     def __str__(self):
         return self.text
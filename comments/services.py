@@ -0,0 +1,39 @@
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from backend.utils import send_email
+from talent.models import Person, PersonPreferences
+
+
+def get_mention_recipients(usernames):
+    """username -> (person id, email) of the mentioned people who want mention emails, in one query"""
+    # the latest preferences row of a person is the one in effect, as in PersonType.resolve_preferences
+    send_me_mentions = PersonPreferences.objects \
+        .filter(person=OuterRef("pk")) \
+        .order_by("-id") \
+        .values("send_me_mentions")[:1]
+    persons = Person.objects \
+        .filter(user__username__in=set(usernames), email_address__isnull=False) \
+        .exclude(email_address="") \
+        .annotate(send_me_mentions=Coalesce(Subquery(send_me_mentions), Value(True))) \
+        .filter(send_me_mentions=True) \
+        .values_list("user__username", "id", "email_address")
+
+    return {username: (person_id, email) for username, person_id, email in persons}
+
+
+def queue_mention_emails(author, text, usernames):
+    """Queue one email to the people mentioned in a comment, the process_outbound_emails worker sends it"""
+    emails = {
+        email for person_id, email in get_mention_recipients(usernames).values()
+        if person_id != author.id
+    }
+
+    if emails:
+        # one message for all recipients, every one of them gets a separate personalization
+        send_email(
+            to_emails=sorted(emails),
+            subject='You have been mentioned in the comment',
+            content=text,
+            is_multiple=True
+        )
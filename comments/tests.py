@@ -1,3 +1,123 @@
-from django.test import TestCase
+from types import SimpleNamespace
 
-# Create your tests here.
+from backend.test_base import TestCase
+from api.comments.utils import create_comment, get_comment_thread, resolve_comments
+from comments.models import TaskComment
+from emails.models import OutboundEmail
+from talent.models import Person, PersonPreferences
+from users.models import User
+from work.models import Task
+
+
+class ResolveCommentsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.task = Task.objects.create(title="Task", description="", short_description="")
+        persons = [
+            Person.objects.create(first_name=f"Person {i}", slug=f"person{i}", headline="",
+                                  user=User.objects.create(username=f"person{i}", email=f"person{i}@example.com"))
+            for i in range(3)
+        ]
+
+        root = TaskComment.add_root(text="root")
+        Task.objects.filter(pk=cls.task.pk).update(comments_start=root)
+
+        # a thread on another task must not leak into this one
+        TaskComment.add_root(text="root").add_child(text="Other task", person=persons[0])
+
+        for i in range(10):
+            comment = TaskComment.objects.get(pk=root.pk).add_child(text=f"Comment {i}", person=persons[i % 3])
+            comment.add_child(text=f"Reply {i}", person=persons[(i + 1) % 3])
+
+    def test_thread(self):
+        with self.assertNumQueries(3):
+            tree = resolve_comments(self.task.id, Task, TaskComment)
+
+        self.assertEqual(len(tree), 10)
+        self.assertEqual(tree[0]["data"], {"person": {"firstName": "Person 0", "slug": "person0"}, "text": "Comment 0"})
+        self.assertEqual(tree[0]["children"][0]["data"]["text"], "Reply 0")
+        self.assertEqual(tree[0]["children"][0]["data"]["person"]["slug"], "person1")
+        self.assertNotIn("children", tree[0]["children"][0])
+
+    def test_no_comments(self):
+        task = Task.objects.create(title="Quiet task", description="", short_description="")
+        self.assertIsNone(resolve_comments(task.id, Task, TaskComment))
+
+    def test_thread_pages(self):
+        with self.assertNumQueries(3):
+            page = get_comment_thread(self.task.id, Task, TaskComment, {"first": 4})
+
+        self.assertEqual([edge.node.text for edge in page.edges], [f"Comment {i}" for i in range(4)])
+        self.assertEqual(page.edges[0].node.numchild, 1)
+        self.assertEqual(page.edges[0].node.replies, [])
+        self.assertTrue(page.page_info.has_next_page)
+
+        page = get_comment_thread(self.task.id, Task, TaskComment, {"first": 4, "after": page.page_info.end_cursor})
+        self.assertEqual([edge.node.text for edge in page.edges], [f"Comment {i}" for i in range(4, 8)])
+
+    def test_thread_replies(self):
+        with self.assertNumQueries(4):
+            page = get_comment_thread(self.task.id, Task, TaskComment, {"first": 2, "max_depth": 2})
+
+        self.assertEqual([[reply.text for reply in edge.node.replies] for edge in page.edges],
+                         [["Reply 0"], ["Reply 1"]])
+        self.assertEqual(page.edges[0].node.replies[0].author["slug"], "person1")
+
+        parent_id = page.edges[0].node.id
+        page = get_comment_thread(self.task.id, Task, TaskComment, {"parent_id": parent_id})
+        self.assertEqual([edge.node.text for edge in page.edges], ["Reply 0"])
+
+    def test_last_possible_sibling(self):
+        # no path sorts right after the subtree of the final possible sibling
+        last = TaskComment.objects.get(text="Comment 9")
+        path = last.path[:-TaskComment.steplen] + TaskComment.alphabet[-1] * TaskComment.steplen
+        for comment in TaskComment.objects.filter(path__startswith=last.path):
+            TaskComment.objects.filter(pk=comment.pk).update(path=path + comment.path[len(last.path):])
+
+        page = get_comment_thread(self.task.id, Task, TaskComment, {"first": 20, "max_depth": 2})
+        self.assertEqual([[reply.text for reply in edge.node.replies] for edge in page.edges],
+                         [[f"Reply {i}"] for i in range(10)])
+
+        page = get_comment_thread(self.task.id, Task, TaskComment, {"parent_id": last.id, "max_depth": 2})
+        self.assertEqual([edge.node.text for edge in page.edges], ["Reply 9"])
+
+
+class MentionEmailTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.task = Task.objects.create(title="Task", description="", short_description="")
+        cls.persons = {
+            username: Person.objects.create(first_name=username, slug=username, headline="",
+                                            email_address=f"{username}@example.com",
+                                            user=User.objects.create(username=username,
+                                                                     email=f"{username}@example.com"))
+            for username in ["author", "alice", "bob", "quiet", "back"]
+        }
+        PersonPreferences.objects.create(person=cls.persons["quiet"], send_me_mentions=False)
+        # only the latest preferences count
+        PersonPreferences.objects.create(person=cls.persons["bob"], send_me_mentions=False)
+        PersonPreferences.objects.create(person=cls.persons["bob"], send_me_mentions=True)
+        PersonPreferences.objects.create(person=cls.persons["back"], send_me_mentions=True)
+        PersonPreferences.objects.create(person=cls.persons["back"], send_me_mentions=False)
+
+    def comment(self, text):
+        comment_input = SimpleNamespace(text=text, parent_id=None, commented_object_id=self.task.id)
+        return create_comment(self.persons["author"], comment_input, Task, TaskComment)
+
+    def test_comment_without_mentions(self):
+        self.comment("No mentions here")
+        self.assertFalse(OutboundEmail.objects.exists())
+
+    def test_mentions_are_queued(self):
+        self.comment("@alice @bob @alice @quiet @back @author @nobody have a look")
+
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.to_emails, ["alice@example.com", "bob@example.com"])
+        self.assertEqual(email.subject, "You have been mentioned in the comment")
+        self.assertEqual(email.content, "@alice @bob @alice @quiet @back @author @nobody have a look")
+        self.assertTrue(email.is_multiple)
+        self.assertEqual(email.status, OutboundEmail.STATUS_PENDING)
+
+    def test_only_the_author_mentioned(self):
+        self.comment("@author @quiet")
+        self.assertFalse(OutboundEmail.objects.exists())
@@ -2,6 +2,7 @@ import uuid
 
 from django.core.validators import RegexValidator
 from django.db import models
+from model_utils import FieldTracker
 from django.core.exceptions import ValidationError
 from talent.models import Person, ProductPerson
 from work.models import Product
@@ -24,6 +25,7 @@ class Organisation(TimeStampMixin):
                                 ])
     name = models.CharField(max_length=512, unique=True)
     photo = models.ImageField(upload_to='avatars/', null=True, blank=True)
+    tracker = FieldTracker(fields=['username'])
 
     class Meta:
         verbose_name_plural = "Organisations"
@@ -62,6 +64,7 @@ class OrganisationPerson(TimeStampMixin, UUIDMixin):
 class ProductOwner(TimeStampMixin, UUIDMixin):
     organisation = models.ForeignKey(Organisation, on_delete=models.CASCADE, blank=True, null=True, default=None)
     person = models.ForeignKey(Person, on_delete=models.CASCADE, blank=True, null=True)
+    tracker = FieldTracker(fields=['organisation', 'person'])
 
     def __str__(self):
         return f"Person: {self.person.first_name}" if self.person else f"Organization: {self.organisation.name}"
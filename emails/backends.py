@@ -0,0 +1,44 @@
+import os
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils.module_loading import import_string
+from sendgrid import SendGridAPIClient
+from sendgrid.helpers.mail import Mail, Personalization, To
+
+
+class SendGridBackend:
+    """Sends every batch as one API request with a personalization per message"""
+    # SendGrid accepts at most 1000 personalizations per request
+    max_batch_size = 1000
+
+    def __init__(self):
+        self.client = SendGridAPIClient(os.environ.get('SENDGRID_API_KEY'))
+
+    def send(self, subject, content, recipient_groups):
+        message = Mail(from_email=settings.EMAIL_HOST, subject=subject, html_content=content)
+        for recipients in recipient_groups:
+            personalization = Personalization()
+            for email in recipients:
+                personalization.add_to(To(email))
+            message.add_personalization(personalization)
+
+        self.client.send(message)
+
+
+class DjangoMailBackend:
+    """Sends through Django's EMAIL_BACKEND, e.g. the console, file, locmem or a local SMTP server"""
+    max_batch_size = 100
+
+    def send(self, subject, content, recipient_groups):
+        messages = []
+        for recipients in recipient_groups:
+            message = EmailMessage(subject=subject, body=content, from_email=settings.EMAIL_HOST, to=recipients)
+            message.content_subtype = "html"
+            messages.append(message)
+
+        get_connection(fail_silently=False).send_messages(messages)
+
+
+def get_backend():
+    return import_string(settings.OUTBOUND_EMAIL_BACKEND)()
@@ -0,0 +1,43 @@
+from django.contrib.postgres.fields import ArrayField
+from django.db import models
+from django.db.models import Q
+
+
+class OutboundEmail(models.Model):
+    """An email waiting to be sent by the process_outbound_emails worker"""
+    STATUS_PENDING = 0
+    STATUS_SENT = 1
+    STATUS_FAILED = 2
+
+    STATUS = (
+        (STATUS_PENDING, "Pending"),
+        (STATUS_SENT, "Sent"),
+        (STATUS_FAILED, "Failed"),
+    )
+
+    to_emails = ArrayField(models.CharField(max_length=254))
+    subject = models.TextField()
+    content = models.TextField()
+    # one message per recipient instead of one message to all of them
+    is_multiple = models.BooleanField(default=False)
+    status = models.IntegerField(choices=STATUS, default=STATUS_PENDING)
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField()
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["next_attempt_at", "id"], name="outboundemail_pending_idx",
+                         condition=Q(status=0)),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.to_emails)}"
+
+    def get_recipient_groups(self):
+        """The recipient lists of the messages this email is sent as"""
+        if self.is_multiple:
+            return [[email] for email in self.to_emails]
+        return [self.to_emails]
@@ -0,0 +1,102 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from emails.backends import get_backend
+from emails.models import OutboundEmail
+
+
+def queue_email(to_emails, subject, content, is_multiple=False):
+    return OutboundEmail.objects.create(
+        to_emails=list(to_emails),
+        subject=subject,
+        content=content,
+        is_multiple=is_multiple,
+        next_attempt_at=timezone.now(),
+    )
+
+
+def get_retry_delay(attempts):
+    delay = settings.OUTBOUND_EMAIL_RETRY_DELAY * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, settings.OUTBOUND_EMAIL_MAX_RETRY_DELAY))
+
+
+def get_batches(emails, max_batch_size):
+    """Group emails with the same subject and content into (subject, content, emails) batches,
+    each one small enough to be sent with a single backend call"""
+    same_emails = defaultdict(list)
+    for email in emails:
+        same_emails[(email.subject, email.content)].append(email)
+
+    for (subject, content), group in same_emails.items():
+        batch = []
+        size = 0
+        for email in group:
+            email_size = len(email.get_recipient_groups())
+            if batch and size + email_size > max_batch_size:
+                yield subject, content, batch
+                batch, size = [], 0
+            batch.append(email)
+            size += email_size
+        yield subject, content, batch
+
+
+def process_outbound_emails(batch_size=100, backend=None):
+    """Send one batch of due emails, returns how many were sent, rescheduled and given up on"""
+    backend = backend or get_backend()
+    stats = dict(sent=0, retried=0, failed=0)
+
+    with transaction.atomic():
+        now = timezone.now()
+        emails = list(
+            OutboundEmail.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=OutboundEmail.STATUS_PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")[:batch_size]
+        )
+
+        for subject, content, batch in get_batches(emails, backend.max_batch_size):
+            try:
+                backend.send(subject, content, [recipients for email in batch
+                                                for recipients in email.get_recipient_groups()])
+            except Exception as e:
+                print("Failed to send emails:", e, flush=True)
+                for email in batch:
+                    email.attempts += 1
+                    email.last_error = str(e)
+                    if email.attempts >= settings.OUTBOUND_EMAIL_MAX_ATTEMPTS:
+                        email.status = OutboundEmail.STATUS_FAILED
+                        stats["failed"] += 1
+                    else:
+                        email.next_attempt_at = now + get_retry_delay(email.attempts)
+                        stats["retried"] += 1
+                continue
+
+            for email in batch:
+                email.attempts += 1
+                email.status = OutboundEmail.STATUS_SENT
+                email.sent_at = now
+            stats["sent"] += len(batch)
+
+        OutboundEmail.objects.bulk_update(
+            emails, ["status", "attempts", "next_attempt_at", "last_error", "sent_at"]
+        )
+
+    return stats
+
+
+def get_outbound_email_metrics():
+    """Queue size per status and the age of the oldest pending email in seconds"""
+    metrics = {label.lower(): 0 for _, label in OutboundEmail.STATUS}
+    for status, count in OutboundEmail.objects.values_list("status").annotate(count=Count("id")).order_by():
+        metrics[dict(OutboundEmail.STATUS)[status].lower()] = count
+
+    oldest = OutboundEmail.objects \
+        .filter(status=OutboundEmail.STATUS_PENDING) \
+        .aggregate(oldest=Min("created_at"))["oldest"]
+    metrics["oldest_pending_seconds"] = (timezone.now() - oldest).total_seconds() if oldest else 0
+    return metrics
@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+from django.core import mail
+from django.test import override_settings
+from django.utils import timezone
+
+from backend.test_base import TestCase
+from backend.utils import send_email
+from emails.backends import DjangoMailBackend
+from emails.models import OutboundEmail
+from emails.services import get_outbound_email_metrics, process_outbound_emails
+
+
+class FakeBackend:
+    max_batch_size = 3
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+
+    def send(self, subject, content, recipient_groups):
+        self.calls.append((subject, recipient_groups))
+        if self.fail:
+            raise Exception("Service unavailable")
+
+
+@override_settings(OUTBOUND_EMAIL_MAX_ATTEMPTS=2, OUTBOUND_EMAIL_RETRY_DELAY=60)
+class OutboundEmailTest(TestCase):
+    def test_send_email_is_queued(self):
+        send_email("person@example.com", "Subject", "<p>Content</p>")
+        send_email(["", None], "Subject", "Content")
+
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.to_emails, ["person@example.com"])
+        self.assertEqual(email.status, OutboundEmail.STATUS_PENDING)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_batching(self):
+        for i in range(4):
+            send_email([f"person{i}@example.com"], "Mentioned", "Content")
+        send_email(["a@example.com", "b@example.com"], "Mentioned", "Content", is_multiple=True)
+        send_email(["c@example.com"], "Other", "Content")
+
+        backend = FakeBackend()
+        stats = process_outbound_emails(backend=backend)
+
+        self.assertEqual(stats, dict(sent=6, retried=0, failed=0))
+        # 6 messages with the same content are split by max_batch_size, the other subject is sent on its own
+        self.assertEqual([len(groups) for _, groups in backend.calls], [3, 3, 1])
+        self.assertIn(["a@example.com"], backend.calls[1][1])
+        self.assertIn(["b@example.com"], backend.calls[1][1])
+        self.assertFalse(OutboundEmail.objects.exclude(status=OutboundEmail.STATUS_SENT).exists())
+
+    def test_retry_and_failure(self):
+        send_email(["person@example.com"], "Subject", "Content")
+
+        stats = process_outbound_emails(backend=FakeBackend(fail=True))
+        self.assertEqual(stats, dict(sent=0, retried=1, failed=0))
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.attempts, 1)
+        self.assertEqual(email.last_error, "Service unavailable")
+        self.assertGreater(email.next_attempt_at, timezone.now() + timedelta(seconds=50))
+
+        # not due yet
+        self.assertEqual(process_outbound_emails(backend=FakeBackend(fail=True)), dict(sent=0, retried=0, failed=0))
+
+        OutboundEmail.objects.update(next_attempt_at=timezone.now())
+        stats = process_outbound_emails(backend=FakeBackend(fail=True))
+        self.assertEqual(stats, dict(sent=0, retried=0, failed=1))
+        self.assertEqual(OutboundEmail.objects.get().status, OutboundEmail.STATUS_FAILED)
+        self.assertEqual(get_outbound_email_metrics()["failed"], 1)
+
+    def test_django_mail_backend(self):
+        send_email(["a@example.com", "b@example.com"], "Subject", "<p>Content</p>", is_multiple=True)
+
+        process_outbound_emails(backend=DjangoMailBackend())
+
+        self.assertEqual([message.to for message in mail.outbox], [["a@example.com"], ["b@example.com"]])
+        self.assertEqual(mail.outbox[0].content_subtype, "html")
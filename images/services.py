@@ -0,0 +1,260 @@
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import tempfile
+
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date, parse_etags
+
+from backend.s3_controller import get_file_object
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class FileCache:
+    """LRU cache of bucket files on the local disk, shared by all workers of the host.
+
+    Every file is stored next to a JSON file with its headers. Hits touch the file, so once the cache
+    grows over max_size bytes the least recently used files are removed first.
+    """
+
+    def __init__(self, directory, max_size, max_file_size):
+        self.directory = directory
+        self.max_size = max_size
+        self.max_file_size = max_file_size
+
+    def get_paths(self, key):
+        name = hashlib.sha1(key.encode()).hexdigest()
+        path = os.path.join(self.directory, name)
+        return path, f"{path}.json"
+
+    def open(self, key):
+        """(headers, open file) of a cached file or (None, None)"""
+        path, meta_path = self.get_paths(key)
+        try:
+            with open(meta_path) as meta_file:
+                meta = json.load(meta_file)
+            file = open(path, "rb")
+            os.utime(path)
+        except (OSError, ValueError):
+            return None, None
+        return meta, file
+
+    def write(self, key, meta, chunks):
+        """Yield chunks while copying them to the cache, the file is only added once it was read completely"""
+        path, meta_path = self.get_paths(key)
+        file = temp_path = None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            file = os.fdopen(fd, "wb")
+        except OSError as e:
+            print("Failed to cache file:", e, flush=True)
+
+        completed = False
+        try:
+            for chunk in chunks:
+                if file:
+                    try:
+                        file.write(chunk)
+                    except OSError as e:
+                        print("Failed to cache file:", e, flush=True)
+                        file.close()
+                        file = None
+                yield chunk
+            completed = file is not None
+        finally:
+            if file:
+                file.close()
+            if completed:
+                self.add(temp_path, path, meta_path, meta)
+            elif temp_path:
+                remove_file(temp_path)
+
+    def add(self, temp_path, path, meta_path, meta):
+        try:
+            os.replace(temp_path, path)
+            fd, temp_meta_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as meta_file:
+                json.dump(meta, meta_file)
+            os.replace(temp_meta_path, meta_path)
+        except OSError as e:
+            print("Failed to cache file:", e, flush=True)
+            remove_file(temp_path)
+            return
+
+        self.evict()
+
+    def evict(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith((".json", ".tmp")):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        size = sum(file_size for _, file_size, _ in files)
+        for _, file_size, path in sorted(files):
+            if size <= self.max_size:
+                break
+            remove_file(f"{path}.json")
+            remove_file(path)
+            size -= file_size
+
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def get_file_cache():
+    if not settings.IMAGE_CACHE_DIR:
+        return None
+    return FileCache(settings.IMAGE_CACHE_DIR, settings.IMAGE_CACHE_SIZE, settings.IMAGE_CACHE_MAX_FILE_SIZE)
+
+
+def get_content_type(name, content_type=None):
+    """Content type stored in S3, or one guessed from the name for files uploaded without it"""
+    if content_type and content_type not in ("binary/octet-stream", "application/octet-stream"):
+        return content_type
+    return mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+
+def parse_range(header, size):
+    """(start, end) of a single bytes range or None when there is no usable range, raises ValueError if
+    the range can't be satisfied"""
+    match = RANGE_RE.match(header or "")
+    if not match or match.groups() == ("", ""):
+        return None
+
+    start, end = match.groups()
+    if not start:
+        suffix_length = int(end)
+        if not suffix_length or not size:
+            raise ValueError("Unsatisfiable range")
+        return max(size - suffix_length, 0), size - 1
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start > end:
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match or not etag:
+        return False
+
+    etags = [tag[2:] if tag.startswith("W/") else tag for tag in parse_etags(if_none_match)]
+    return "*" in etags or etag in etags
+
+
+def set_file_headers(response, etag, last_modified):
+    if etag:
+        response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = last_modified
+    response["Accept-Ranges"] = "bytes"
+    response["Cache-Control"] = f"max-age={settings.IMAGE_CACHE_MAX_AGE}"
+    return response
+
+
+def iter_body(body):
+    try:
+        yield from body.iter_chunks(settings.IMAGE_CHUNK_SIZE)
+    finally:
+        body.close()
+
+
+def iter_file(file, start, length):
+    try:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(settings.IMAGE_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def get_cached_file_response(meta, file, if_none_match, byte_range):
+    if etag_matches(if_none_match, meta["etag"]):
+        file.close()
+        return set_file_headers(HttpResponse(status=304), meta["etag"], meta["last_modified"])
+
+    size = meta["size"]
+    try:
+        file_range = parse_range(byte_range, size)
+    except ValueError:
+        file.close()
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    start, end = file_range or (0, size - 1)
+    response = StreamingHttpResponse(iter_file(file, start, end - start + 1), status=206 if file_range else 200,
+                                     content_type=meta["content_type"])
+    response["Content-Length"] = end - start + 1
+    if file_range:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return set_file_headers(response, meta["etag"], meta["last_modified"])
+
+
+def get_file_response(request, name, subdir):
+    """Stream a bucket file in chunks, served from the local disk cache when IMAGE_CACHE_DIR is set.
+
+    ETag, Last-Modified and Content-Type of the S3 object are forwarded, If-None-Match and single byte
+    Range requests are answered without sending the whole file.
+    """
+    key = f"{subdir}/{name}"
+    if_none_match = request.headers.get("If-None-Match")
+    byte_range = request.headers.get("Range")
+
+    cache = get_file_cache()
+    if cache:
+        meta, file = cache.open(key)
+        if meta:
+            return get_cached_file_response(meta, file, if_none_match, byte_range)
+
+    try:
+        obj = get_file_object(name, subdir, if_none_match=if_none_match, byte_range=byte_range)
+    except ClientError as e:
+        code = e.response.get("Error", {}).get("Code")
+        if code in ("304", "NotModified"):
+            headers = e.response.get("ResponseMetadata", {}).get("HTTPHeaders", {})
+            return set_file_headers(HttpResponse(status=304), headers.get("etag"), headers.get("last-modified"))
+        if code in ("404", "NoSuchKey"):
+            raise Http404
+        if code == "InvalidRange":
+            return HttpResponse(status=416)
+        raise
+
+    meta = dict(
+        etag=obj.get("ETag"),
+        last_modified=http_date(obj["LastModified"].timestamp()) if obj.get("LastModified") else None,
+        content_type=get_content_type(name, obj.get("ContentType")),
+        size=obj["ContentLength"],
+    )
+
+    chunks = iter_body(obj["Body"])
+    # partial responses aren't cached, the next full request fills the cache
+    if cache and not obj.get("ContentRange") and meta["size"] <= cache.max_file_size:
+        chunks = cache.write(key, meta, chunks)
+
+    response = StreamingHttpResponse(chunks, status=206 if obj.get("ContentRange") else 200,
+                                     content_type=meta["content_type"])
+    response["Content-Length"] = meta["size"]
+    if obj.get("ContentRange"):
+        response["Content-Range"] = obj["ContentRange"]
+    return set_file_headers(response, meta["etag"], meta["last_modified"])
@@ -0,0 +1,91 @@
+import io
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from unittest import mock
+
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+from django.http import Http404
+from django.test import RequestFactory, override_settings
+
+from backend.test_base import TestCase
+from images.services import get_file_response, parse_range
+
+DATA = bytes(range(256)) * 10
+
+
+def get_object(name, subdir, if_none_match=None, byte_range=None):
+    if if_none_match == '"etag"':
+        raise ClientError({"Error": {"Code": "304"}}, "GetObject")
+    if name == "missing.png":
+        raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+
+    obj = dict(ETag='"etag"', LastModified=datetime(2026, 1, 1, tzinfo=timezone.utc),
+               ContentType="binary/octet-stream")
+    data = DATA
+    if byte_range:
+        start, end = parse_range(byte_range, len(DATA))
+        data = DATA[start:end + 1]
+        obj["ContentRange"] = f"bytes {start}-{end}/{len(DATA)}"
+    return dict(obj, Body=StreamingBody(io.BytesIO(data), len(data)), ContentLength=len(data))
+
+
+@override_settings(IMAGE_CHUNK_SIZE=1000)
+class FileResponseTest(TestCase):
+    def setUp(self):
+        patcher = mock.patch("images.services.get_file_object", side_effect=get_object)
+        self.get_object = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, name="avatar.png", **headers):
+        request = RequestFactory().get(f"/images/avatar/{name}", **headers)
+        return get_file_response(request, name, "avatar")
+
+    def test_stream(self):
+        response = self.get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), DATA)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertEqual(response["ETag"], '"etag"')
+        self.assertEqual(response["Last-Modified"], "Thu, 01 Jan 2026 00:00:00 GMT")
+        self.assertEqual(response["Content-Length"], str(len(DATA)))
+
+    def test_conditional_and_range(self):
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH='"etag"').status_code, 304)
+
+        response = self.get(HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 10-19/{len(DATA)}")
+        self.assertEqual(b"".join(response.streaming_content), DATA[10:20])
+
+        with self.assertRaises(Http404):
+            self.get("missing.png")
+
+    def test_disk_cache(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        with override_settings(IMAGE_CACHE_DIR=directory, IMAGE_CACHE_SIZE=len(DATA) * 2):
+            # a partial response doesn't fill the cache
+            b"".join(self.get(HTTP_RANGE="bytes=0-9").streaming_content)
+            self.assertEqual(b"".join(self.get().streaming_content), DATA)
+            self.assertEqual(self.get_object.call_count, 2)
+
+            response = self.get()
+            self.assertEqual(b"".join(response.streaming_content), DATA)
+            self.assertEqual(response["ETag"], '"etag"')
+            self.assertEqual(self.get(HTTP_IF_NONE_MATCH='W/"etag"').status_code, 304)
+
+            response = self.get(HTTP_RANGE="bytes=-10")
+            self.assertEqual(response.status_code, 206)
+            self.assertEqual(b"".join(response.streaming_content), DATA[-10:])
+            self.assertEqual(self.get(HTTP_RANGE=f"bytes={len(DATA)}-").status_code, 416)
+            self.assertEqual(self.get_object.call_count, 2)
+
+            # the least recently used file is evicted once the cache is full
+            for name in ("first.png", "second.png"):
+                b"".join(self.get(name).streaming_content)
+            b"".join(self.get().streaming_content)
+            self.assertEqual(self.get_object.call_count, 5)
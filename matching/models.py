@@ -6,7 +6,7 @@ from model_utils import FieldTracker
 from notifications.signals import notify
 
 from backend.utils import send_email
-from work.models import Task
+from work.models import Task, enqueue_task_listings
 from talent.models import Person
 from backend.mixins import TimeStampMixin, UUIDMixin
 
@@ -34,6 +34,8 @@ class TaskClaim(TimeStampMixin, UUIDMixin):
 
 @receiver(post_save, sender=TaskClaim)
 def save_task_claim(sender, instance, created, **kwargs):
+    enqueue_task_listings([instance.task_id])
+
     task = instance.task
     reviewer = getattr(task, "reviewer", None)
     contributor = instance.person
@@ -0,0 +1,18 @@
+# Generated by Django 3.1 on 2026-10-18 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('talent', '0046_personpreferences'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='personpreferences',
+            name='send_me_mentions',
+            field=models.BooleanField(default=True),
+        ),
+    ]
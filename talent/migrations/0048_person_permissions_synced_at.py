@@ -0,0 +1,18 @@
+# Generated by Django 3.1 on 2026-10-18 15:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('talent', '0047_personpreferences_send_me_mentions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='person',
+            name='permissions_synced_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -8,6 +8,7 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.utils.translation import ugettext_lazy as _
 from entitlements.exceptions import ValidationError as ValidError
+from model_utils import FieldTracker
 from backend.mixins import TimeStampMixin, UUIDMixin
 
 
@@ -22,6 +23,9 @@ class Person(TimeStampMixin):
     headline = models.TextField()
     user = models.ForeignKey(to='users.User', on_delete=models.CASCADE, default=None)
     test_user = models.BooleanField(default=False, blank=True)
+    # last sync of the product rights with AuthMachine
+    permissions_synced_at = models.DateTimeField(null=True, blank=True)
+    tracker = FieldTracker(fields=['first_name'])
 
     class Meta:
         verbose_name_plural = 'People'
@@ -123,4 +127,5 @@ class SocialAccount(models.Model):
 
 class PersonPreferences(models.Model):
     person = models.ForeignKey(Person, on_delete=models.CASCADE, related_name="preferences")
-    send_me_challenges = models.BooleanField(default=True)
\ No newline at end of file
+    send_me_challenges = models.BooleanField(default=True)
+    send_me_mentions = models.BooleanField(default=True)
\ No newline at end of file
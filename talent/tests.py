@@ -1,3 +1,80 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from backend.services import update_user_permissions
+from backend.test_base import TestCase
+from talent.models import Person, ProductPerson
+from users.models import User
+from work.models import Product
+
+
+class UpdateUserPermissionsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="person", email="person@example.com")
+        self.person = Person.objects.create(first_name="Person", slug="person", headline="", user=self.user)
+        self.products = [
+            Product.objects.create(name=f"product{i}", short_description="", website="")
+            for i in range(3)
+        ]
+        # product2 isn't returned by AuthMachine, the person has no rights left on it
+        for product, right in ((self.products[0], 2), (self.products[0], 3), (self.products[2], 4)):
+            ProductPerson.objects.create(person=self.person, product=product, right=right)
+
+        patcher = mock.patch("backend.services.AuthMachineClient")
+        self.client_class = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client_class.return_value.get_permissions.return_value = {
+            "is_superuser": True,
+            "permissions": {
+                "product0": ["product_admin"],
+                "product1": ["contributor"],
+                "unknown": ["product_admin"],
+            },
+        }
+
+    def get_rights(self):
+        return set(ProductPerson.objects.filter(person=self.person).values_list("product__slug", "right"))
+
+    def test_sync(self):
+        kept_id = ProductPerson.objects.get(product=self.products[0], right=2).id
+
+        update_user_permissions(None, self.user, "1")
+
+        self.assertEqual(self.get_rights(), {("product0", 2), ("product1", 4)})
+        self.assertTrue(ProductPerson.objects.filter(id=kept_id).exists())
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_superuser)
+        self.person.refresh_from_db()
+        self.assertIsNotNone(self.person.permissions_synced_at)
+
+    def test_revoke(self):
+        self.client_class.return_value.get_permissions.return_value = {
+            "is_superuser": False,
+            "permissions": {"product0": []},
+        }
+
+        update_user_permissions(None, self.user, "1")
+
+        self.assertEqual(self.get_rights(), set())
+        sent_slugs = self.client_class.return_value.get_permissions.call_args[1]["objects"]
+        self.assertEqual(sorted(sent_slugs), ["product0", "product1", "product2"])
+
+    def test_sync_interval(self):
+        update_user_permissions(None, self.user, "1")
+        update_user_permissions(None, self.user, "1")
+        self.assertEqual(self.client_class.return_value.get_permissions.call_count, 1)
+
+        update_user_permissions(None, self.user, "1", force=True)
+        self.assertEqual(self.client_class.return_value.get_permissions.call_count, 2)
+
+    def test_failed_request(self):
+        self.client_class.return_value.get_permissions.return_value = {}
+        self.user.is_superuser = True
+        self.user.save()
+
+        update_user_permissions(None, self.user, "1")
+
+        self.person.refresh_from_db()
+        self.assertIsNone(self.person.permissions_synced_at)
+        self.assertEqual(len(self.get_rights()), 3)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_superuser)
@@ -5,6 +5,7 @@ from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.models import AbstractUser, PermissionsMixin
 from django.core.validators import RegexValidator
 from django.db import models
+from model_utils import FieldTracker
 from polymorphic.managers import PolymorphicManager
 from django.contrib.auth.models import AbstractBaseUser
 
@@ -69,6 +70,8 @@ class User(AbstractBaseUser):
                                     )
                                 ])
 
+    tracker = FieldTracker(fields=['username'])
+
     REQUIRED_FIELDS = ['email']
 
     def has_perm(self, perm, obj=None):
@@ -0,0 +1,22 @@
+# Generated by Django 3.1 on 2026-10-18 09:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('work', '0097_auto_20211225_2230'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskListingQueue',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('task', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='listing_queue', to='work.task')),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.1 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('work', '0098_tasklistingqueue'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['title', 'id'], name='task_title_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasklisting',
+            index=models.Index(fields=['title', 'id'], name='tasklisting_title_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasklisting',
+            index=models.Index(fields=['priority', 'id'], name='tasklisting_priority_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasklisting',
+            index=models.Index(fields=['product', 'title', 'id'], name='tasklisting_product_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasklisting',
+            index=models.Index(fields=['product', 'priority', 'id'], name='tasklisting_product_prio_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.1 on 2026-10-18 10:48
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('work', '0099_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tasklisting',
+            name='is_private',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE work_tasklisting
+                SET is_private = work_product.is_private
+                FROM work_product
+                WHERE work_product.id = work_tasklisting.product_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='tasklisting',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['tags'], name='tasklisting_tags_gin_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasklisting',
+            index=models.Index(condition=models.Q(is_private=False), fields=['status', 'title', 'id'], name='tasklisting_public_status_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 3.1 on 2026-10-18 11:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('work', '0100_tasklisting_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tasklisting',
+            name='category',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='task_listings', to='work.taskcategory'),
+        ),
+        migrations.AddField(
+            model_name='tasklisting',
+            name='category_name',
+            field=models.CharField(max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='tasklisting',
+            name='category_parent',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='work.taskcategory'),
+        ),
+        migrations.AddField(
+            model_name='tasklisting',
+            name='expertise_data',
+            field=models.JSONField(null=True),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE work_tasklisting
+                SET category_id = work_taskcategory.id,
+                    category_name = work_taskcategory.name,
+                    category_parent_id = work_taskcategory.parent_id
+                FROM work_task
+                JOIN work_taskcategory ON work_taskcategory.id = work_task.category_id
+                WHERE work_task.id = work_tasklisting.task_id;
+
+                UPDATE work_tasklisting
+                SET expertise_data = task_expertise.data
+                FROM (
+                    SELECT work_task_expertise.task_id,
+                           jsonb_agg(jsonb_build_object('id', work_expertise.id, 'name', work_expertise.name)
+                                     ORDER BY work_expertise.id) AS data
+                    FROM work_task_expertise
+                    JOIN work_expertise ON work_expertise.id = work_task_expertise.expertise_id
+                    GROUP BY work_task_expertise.task_id
+                ) AS task_expertise
+                WHERE task_expertise.task_id = work_tasklisting.task_id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='tasklisting',
+            index=models.Index(condition=models.Q(is_private=False), fields=['category_parent', 'title', 'id'], name='tasklisting_public_cat_idx'),
+        ),
+    ]
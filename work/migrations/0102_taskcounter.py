@@ -0,0 +1,49 @@
+# Generated by Django 3.1 on 2026-10-18 12:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('work', '0101_tasklisting_category_expertise'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.IntegerField(choices=[(0, 'Draft'), (1, 'Blocked'), (2, 'Available'), (3, 'Claimed'), (4, 'Done'), (5, 'In review')])),
+                ('count', models.IntegerField(default=0)),
+                ('blocked_count', models.IntegerField(default=0)),
+                ('initiative', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='task_counters', to='work.initiative')),
+                ('product', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='task_counters', to='work.product')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='taskcounter',
+            constraint=models.UniqueConstraint(condition=models.Q(initiative__isnull=True), fields=('product', 'status'), name='taskcounter_product_status_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='taskcounter',
+            constraint=models.UniqueConstraint(condition=models.Q(product__isnull=True), fields=('initiative', 'status'), name='taskcounter_initiative_status_uniq'),
+        ),
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO work_taskcounter (product_id, status, count, blocked_count)
+                SELECT product_id, status, COUNT(*), COUNT(*) FILTER (WHERE blocked)
+                FROM work_task
+                WHERE product_id IS NOT NULL
+                GROUP BY product_id, status;
+
+                INSERT INTO work_taskcounter (initiative_id, status, count, blocked_count)
+                SELECT initiative_id, status, COUNT(*), COUNT(*) FILTER (WHERE blocked)
+                FROM work_task
+                WHERE initiative_id IS NOT NULL
+                GROUP BY initiative_id, status;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.1 on 2026-10-18 12:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('work', '0102_taskcounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CapabilityTreeVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='capability_tree_version', to='work.product')),
+            ],
+        ),
+    ]
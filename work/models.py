@@ -1,9 +1,11 @@
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from entitlements.exceptions import ValidationError as ValidError
-from django.db import models, transaction
+from django.db import connection, models, transaction
+from django.db.models import F, Q
 from django.contrib.postgres.fields import ArrayField
-from django.db.models.signals import post_save
+from django.contrib.postgres.indexes import GinIndex
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from model_utils import FieldTracker
 from treebeard.mp_tree import MP_Node
@@ -11,7 +13,7 @@ from backend.mixins import TimeStampMixin, UUIDMixin
 from backend.utils import send_email
 from talent.models import Person, ProductPerson
 from work.mixins import ProductMixin
-from work.utils import get_person_data, to_dict
+from work.utils import JSONBSet, get_product_data, to_dict
 
 
 class Tag(TimeStampMixin):
@@ -39,11 +41,17 @@ class Capability(MP_Node):
 
 @receiver(post_save, sender=Capability)
 def save_capability(sender, instance, created, **kwargs):
+    CapabilityTreeVersion.bump(instance)
     if not created:
         # update tasklisting when capability info is updated
         TaskListing.objects.filter(capability=instance).update(capability_data=to_dict(instance))
 
 
+@receiver(post_delete, sender=Capability)
+def delete_capability(sender, instance, **kwargs):
+    CapabilityTreeVersion.bump(instance)
+
+
 class Attachment(models.Model):
     name = models.CharField(max_length=512)
     path = models.URLField()
@@ -140,17 +148,51 @@ class Product(ProductMixin):
         return self.name
 
 
+class CapabilityTreeVersion(models.Model):
+    """Version of a product's capability tree, bumped on every change so cached snapshots can be keyed by it.
+
+    Kept out of Product so saving a product loaded earlier can't roll the version back.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name="capability_tree_version")
+    version = models.PositiveIntegerField(default=0)
+
+    @classmethod
+    def get_version(cls, product):
+        return cls.objects.filter(product=product).values_list("version", flat=True).first() or 0
+
+    @classmethod
+    def get_capability_version(cls, capability):
+        """Version of the tree the capability belongs to"""
+        root_path = capability.path[:Capability.steplen]
+        return cls.objects \
+            .filter(product__capability_start__path=root_path) \
+            .values_list("version", flat=True) \
+            .first() or 0
+
+    @classmethod
+    def bump(cls, capability):
+        """Bump the version of the product whose tree contains the capability"""
+        root_path = capability.path[:Capability.steplen]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {cls._meta.db_table} (product_id, version)
+                SELECT product.id, 1
+                FROM {Product._meta.db_table} product
+                JOIN {Capability._meta.db_table} root ON root.id = product.capability_start_id
+                WHERE root.path = %s
+                ON CONFLICT (product_id) DO UPDATE SET version = {cls._meta.db_table}.version + 1
+                """,
+                [root_path]
+            )
+
+
 @receiver(post_save, sender=Product)
 def save_product(sender, instance, created, **kwargs):
     if not created:
         # update tasklisting when product info is updated
-        TaskListing.objects.filter(product=instance).update(
-            product_data=dict(
-                name=instance.name,
-                slug=instance.slug,
-                owner=instance.get_product_owner().username
-            )
-        )
+        TaskListing.objects.filter(product=instance).update(product_data=get_product_data(instance),
+                                                            is_private=instance.is_private)
 
 
 class Initiative(TimeStampMixin, UUIDMixin):
@@ -168,10 +210,10 @@ class Initiative(TimeStampMixin, UUIDMixin):
         return self.name
 
     def get_available_tasks_count(self):
-        return self.task_set.filter(status=Task.TASK_STATUS_AVAILABLE).count()
+        return get_task_counts(self).get(Task.TASK_STATUS_AVAILABLE, (0, 0))[0]
 
     def get_completed_task_count(self):
-        return self.task_set.filter(status=Task.TASK_STATUS_DONE).count()
+        return get_task_counts(self).get(Task.TASK_STATUS_DONE, (0, 0))[0]
 
     def get_task_tags(self):
         return Tag.objects.filter(task_tags__initiative=self).distinct("id").all()
@@ -310,6 +352,9 @@ class Task(TimeStampMixin, UUIDMixin):
 
     class Meta:
         verbose_name_plural = "Tasks"
+        indexes = [
+            models.Index(fields=["title", "id"], name="task_title_id_idx"),
+        ]
 
     def __str__(self):
         return self.title
@@ -355,9 +400,9 @@ class Task(TimeStampMixin, UUIDMixin):
 
         return queryset.order_by(sorted_by).all()
 
-    def get_task_link(self, show_domain_name=True):
+    def get_task_link(self, show_domain_name=True, product=None):
         try:
-            product = self.producttask_set.first().product
+            product = product or self.producttask_set.first().product
             product_owner = product.get_product_owner()
             domain_name = settings.FRONT_END_SERVER if show_domain_name else ""
             return f"{domain_name}/{product_owner.username}/{product.slug}/tasks/{self.published_id}"
@@ -404,51 +449,6 @@ def save_task(sender, instance, created, **kwargs):
     except Person.DoesNotExist:
         pass
 
-    task_listing_data = dict(
-        title=instance.title,
-        description=instance.description,
-        short_description=instance.short_description,
-        status=instance.status,
-        tags=list(instance.tag.all().values_list('name', flat=True)),
-        blocked=instance.blocked,
-        featured=instance.featured,
-        priority=instance.priority,
-        published_id=instance.published_id,
-        auto_approve_task_claims=instance.auto_approve_task_claims,
-        task_creator_id=str(instance.created_by.id) if instance.created_by.id else None,
-        created_by=get_person_data(instance.created_by),
-        updated_by=get_person_data(instance.updated_by),
-        reviewer=get_person_data(instance.reviewer) if instance.reviewer else None,
-        product_data={
-            "name": instance.product.name,
-            "slug": instance.product.slug,
-            "owner": instance.product.get_product_owner().username,
-            "website": instance.product.website,
-            "detail_url": instance.product.detail_url,
-            "video_url": instance.product.video_url
-        } if instance.product else None,
-        product=instance.product,
-        has_active_depends=Task.objects.filter(taskdepend__task=instance.id).exclude(
-            status=Task.TASK_STATUS_DONE).exists(),
-        initiative_id=instance.initiative.id if instance.initiative else None,
-        initiative_data=to_dict(instance.initiative) if instance.initiative else None,
-        capability_id=instance.capability.id if instance.capability is not None else None,
-        capability_data=to_dict(instance.capability) if instance.capability else None,
-        in_review=instance.taskclaim_set.filter(kind=0).count() > 0,
-        video_url=instance.video_url,
-    )
-
-    task_claim = instance.taskclaim_set.filter(kind__in=[0, 1]).first()
-
-    if task_claim:
-        task_listing_data["task_claim"] = to_dict(task_claim)
-        task_listing_data["assigned_to_data"] = get_person_data(task_claim.person)
-        task_listing_data["assigned_to_person_id"] = task_claim.person.id if task_claim.person else None
-    else:
-        task_listing_data["task_claim"] = None
-        task_listing_data["assigned_to_data"] = None
-        task_listing_data["assigned_to_person_id"] = None
-
     if created:
         product = instance.product
         last_product_task = None
@@ -457,21 +457,16 @@ def save_task(sender, instance, created, **kwargs):
                 .filter(producttask__product=product) \
                 .order_by('-published_id').last()
         published_id = last_product_task.published_id + 1 if last_product_task else 1
+        # update the row directly, a recursive save would run this handler again
+        Task.objects.filter(pk=instance.pk).update(published_id=published_id)
         instance.published_id = published_id
-        instance.save()
-
-        task_listing_data["published_id"] = published_id
 
-    # create TaskListing object
-    tasklisting_exist = TaskListing.objects.filter(task=instance).exists()
-
-    if tasklisting_exist:
-        TaskListing.objects.filter(task=instance).update(**task_listing_data)
-    else:
-        TaskListing.objects.create(
-            task=instance,
-            **task_listing_data
-        )
+    # the listing is rebuilt by the projection worker, see TaskListingQueue
+    task_ids = [instance.id]
+    if instance.tracker.has_changed('status'):
+        # dependent tasks may get or lose active depends
+        task_ids += list(TaskDepend.objects.filter(depends_by=instance).values_list('task_id', flat=True))
+    enqueue_task_listings(task_ids)
 
 
 class TaskListing(models.Model):
@@ -504,6 +499,28 @@ class TaskListing(models.Model):
     capability_data = models.JSONField(null=True)
 
     in_review = models.BooleanField(default=False)
+    # copy of product.is_private so the public board doesn't have to join work_product
+    is_private = models.BooleanField(default=False)
+    # copies of the task category and expertise so listings never join work_task
+    category = models.ForeignKey(TaskCategory, on_delete=models.SET_NULL, null=True, related_name="task_listings")
+    category_name = models.CharField(max_length=100, null=True)
+    category_parent = models.ForeignKey(TaskCategory, on_delete=models.SET_NULL, null=True, related_name="+")
+    expertise_data = models.JSONField(null=True)
+
+    class Meta:
+        indexes = [
+            # (sort key, id) pairs used by keyset pagination, see api.pagination
+            models.Index(fields=["title", "id"], name="tasklisting_title_id_idx"),
+            models.Index(fields=["priority", "id"], name="tasklisting_priority_id_idx"),
+            models.Index(fields=["product", "title", "id"], name="tasklisting_product_title_idx"),
+            models.Index(fields=["product", "priority", "id"], name="tasklisting_product_prio_idx"),
+            # filter shapes of get_filtered_data
+            GinIndex(fields=["tags"], name="tasklisting_tags_gin_idx"),
+            models.Index(fields=["status", "title", "id"], name="tasklisting_public_status_idx",
+                         condition=Q(is_private=False)),
+            models.Index(fields=["category_parent", "title", "id"], name="tasklisting_public_cat_idx",
+                         condition=Q(is_private=False)),
+        ]
 
     @staticmethod
     def get_filtered_data(input_data, filter_data=None, exclude_data=None):
@@ -532,7 +549,7 @@ class TaskListing(models.Model):
             filter_data["tags__contains"] = tags
 
         if categories:
-            filter_data["task__category__parent__in"] = categories
+            filter_data["category_parent_id__in"] = categories
 
         if priority:
             filter_data["priority__in"] = priority
@@ -543,13 +560,14 @@ class TaskListing(models.Model):
         if assignee:
             filter_data["assigned_to_person_id__in"] = assignee
 
-        filter_data["product__is_private"] = False
+        filter_data["is_private"] = False
 
+        # every filter is a column of the listing, so rows can't be duplicated and no DISTINCT is needed
         queryset = TaskListing.objects.filter(**filter_data)
         if exclude_data:
             queryset = queryset.exclude(**exclude_data)
 
-        return queryset.distinct().order_by(sorted_by).all()
+        return queryset.order_by(sorted_by).all()
 
 
 class TaskDepend(models.Model):
@@ -560,6 +578,254 @@ class TaskDepend(models.Model):
         db_table = 'work_task_depend'
 
 
+
+@receiver(post_save, sender=TaskDepend)
+@receiver(post_delete, sender=TaskDepend)
+def save_task_depend(sender, instance, **kwargs):
+    enqueue_task_listings([instance.task_id])
+
+
+@receiver(m2m_changed, sender=Task.tag.through)
+@receiver(m2m_changed, sender=Task.expertise.through)
+def change_task_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if not reverse:
+        enqueue_task_listings([instance.id])
+    elif pk_set:
+        enqueue_task_listings(pk_set)
+
+
+@receiver(post_save, sender=TaskCategory)
+def save_task_category(sender, instance, created, **kwargs):
+    if not created:
+        TaskListing.objects.filter(category=instance).update(category_name=instance.name,
+                                                             category_parent_id=instance.parent_id)
+
+
+@receiver(post_save, sender=Expertise)
+def save_expertise(sender, instance, created, **kwargs):
+    if not created:
+        enqueue_task_listings(instance.task_expertise.values_list("id", flat=True))
+
+
+class TaskListingQueue(models.Model):
+    """Tasks whose TaskListing row is out of date, one row per task so bursts are coalesced"""
+    task = models.OneToOneField(Task, on_delete=models.CASCADE, related_name="listing_queue")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @classmethod
+    def enqueue(cls, task_ids):
+        # tasks deleted in the meantime are skipped, tasks already queued are left as they are
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {cls._meta.db_table} (task_id, created_at)
+                SELECT id, now() FROM {Task._meta.db_table} WHERE id = ANY(%s)
+                ON CONFLICT (task_id) DO NOTHING
+                """,
+                [list(set(task_ids))]
+            )
+
+    @classmethod
+    def pop(cls, batch_size):
+        """Delete and return up to batch_size queued task ids.
+
+        Must be called inside a transaction: the rows stay locked until the rebuilt listings are committed,
+        so a task made dirty again in the meantime is queued once more instead of being lost.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                DELETE FROM {cls._meta.db_table}
+                WHERE id IN (
+                    SELECT id FROM {cls._meta.db_table}
+                    ORDER BY id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING task_id
+                """,
+                [batch_size]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+def enqueue_task_listings(task_ids):
+    task_ids = [task_id for task_id in task_ids if task_id]
+    if not task_ids:
+        return
+
+    # wait for the commit so the worker never reads task data older than the event
+    if settings.TASK_LISTING_ASYNC:
+        transaction.on_commit(lambda: TaskListingQueue.enqueue(task_ids))
+    else:
+        from work.services import rebuild_task_listings
+        transaction.on_commit(lambda: rebuild_task_listings(task_ids))
+
+
+# TaskListing JSON columns holding get_person_data() copies and the lookup of the person they were built from
+TASK_LISTING_PERSON_COLUMNS = (
+    ("created_by", "task_creator_id"),
+    ("updated_by", "task__updated_by_id"),
+    ("reviewer", "task__reviewer_id"),
+    ("assigned_to_data", "assigned_to_person_id"),
+)
+
+
+def update_task_listings_json(column, key, value, **filter_data):
+    TaskListing.objects.filter(**filter_data).update(**{column: JSONBSet(F(column), key, value)})
+
+
+def update_task_listings_person(key, value, **person_filter):
+    """Set one key of the person copies in every listing referencing the matching persons"""
+    person_ids = Person.objects.filter(**person_filter).values("id")
+    for column, lookup in TASK_LISTING_PERSON_COLUMNS:
+        update_task_listings_json(column, key, value, **{f"{lookup}__in": person_ids})
+
+
+@receiver(post_save, sender=Person)
+def save_person(sender, instance, created, **kwargs):
+    if not created and instance.tracker.has_changed("first_name"):
+        update_task_listings_person("first_name", instance.first_name, id=instance.id)
+
+
+@receiver(post_save, sender="users.User")
+def save_user(sender, instance, created, **kwargs):
+    if created or not instance.tracker.has_changed("username"):
+        return
+
+    update_task_listings_person("username", instance.username, user_id=instance.id)
+    # products owned by the person directly use the username as owner
+    update_task_listings_json("product_data", "owner", instance.username,
+                              product__owner__organisation__isnull=True,
+                              product__owner__person__user_id=instance.id)
+
+
+@receiver(post_save, sender="commercial.Organisation")
+def save_organisation(sender, instance, created, **kwargs):
+    if not created and instance.tracker.has_changed("username"):
+        update_task_listings_json("product_data", "owner", instance.username,
+                                  product__owner__organisation_id=instance.id)
+
+
+@receiver(post_save, sender="commercial.ProductOwner")
+def save_product_owner(sender, instance, created, **kwargs):
+    if created or not instance.tracker.changed():
+        return
+
+    try:
+        owner = instance.organisation.username if instance.organisation else instance.person.user.username
+    except AttributeError:
+        return
+    update_task_listings_json("product_data", "owner", owner, product__owner_id=instance.id)
+
+
+class TaskCounter(models.Model):
+    """Number of tasks per status of a product or an initiative, kept up to date by the task signals.
+
+    A row belongs either to a product (initiative is null) or to an initiative (product is null).
+    Drift from bulk updates is fixed by the reconcile_task_counters command.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, null=True, related_name="task_counters")
+    initiative = models.ForeignKey(Initiative, on_delete=models.CASCADE, null=True, related_name="task_counters")
+    status = models.IntegerField(choices=Task.TASK_STATUS)
+    count = models.IntegerField(default=0)
+    blocked_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product", "status"], condition=Q(initiative__isnull=True),
+                                    name="taskcounter_product_status_uniq"),
+            models.UniqueConstraint(fields=["initiative", "status"], condition=Q(product__isnull=True),
+                                    name="taskcounter_initiative_status_uniq"),
+        ]
+
+    # (column, table, the other scope column)
+    SCOPES = (
+        ("product_id", "work_product", "initiative_id"),
+        ("initiative_id", "work_initiative", "product_id"),
+    )
+
+    @classmethod
+    def change(cls, product_id, initiative_id, status, blocked, delta):
+        """Add delta to the counters the task with these values belongs to"""
+        scope_ids = {"product_id": product_id, "initiative_id": initiative_id}
+        blocked_delta = delta if blocked else 0
+        with connection.cursor() as cursor:
+            for column, table, other_column in cls.SCOPES:
+                scope_id = scope_ids[column]
+                if not scope_id:
+                    continue
+
+                if delta < 0:
+                    # never insert on decrement, the scope may be in the middle of a cascade delete
+                    cursor.execute(
+                        f"""
+                        UPDATE {cls._meta.db_table}
+                        SET count = count + %s, blocked_count = blocked_count + %s
+                        WHERE {column} = %s AND {other_column} IS NULL AND status = %s
+                        """,
+                        [delta, blocked_delta, scope_id, status]
+                    )
+                else:
+                    cursor.execute(
+                        f"""
+                        INSERT INTO {cls._meta.db_table} ({column}, status, count, blocked_count)
+                        SELECT id, %s, %s, %s FROM {table} WHERE id = %s
+                        ON CONFLICT ({column}, status) WHERE {other_column} IS NULL
+                        DO UPDATE SET count = {cls._meta.db_table}.count + EXCLUDED.count,
+                                      blocked_count = {cls._meta.db_table}.blocked_count + EXCLUDED.blocked_count
+                        """,
+                        [status, delta, blocked_delta, scope_id]
+                    )
+
+    @classmethod
+    def reconcile(cls):
+        """Recount every counter from work_task, returns the number of counter rows"""
+        table = cls._meta.db_table
+        with transaction.atomic(), connection.cursor() as cursor:
+            # task saves wait for the recount instead of applying deltas to rows being replaced
+            cursor.execute(f"LOCK TABLE {table} IN EXCLUSIVE MODE")
+            cursor.execute(f"DELETE FROM {table}")
+            rows = 0
+            for column, _, _ in cls.SCOPES:
+                cursor.execute(
+                    f"""
+                    INSERT INTO {table} ({column}, status, count, blocked_count)
+                    SELECT {column}, status, COUNT(*), COUNT(*) FILTER (WHERE blocked)
+                    FROM {Task._meta.db_table}
+                    WHERE {column} IS NOT NULL
+                    GROUP BY {column}, status
+                    """
+                )
+                rows += cursor.rowcount
+            return rows
+
+
+def get_task_counts(scope):
+    """status -> (count, blocked count) of a product or initiative, uses prefetched task_counters"""
+    return {counter.status: (counter.count, counter.blocked_count) for counter in scope.task_counters.all()}
+
+
+@receiver(post_save, sender=Task)
+def count_task(sender, instance, created, **kwargs):
+    # the task tracker tracks every field by attname
+    fields = ("product_id", "initiative_id", "status", "blocked")
+    if not created:
+        if not any(instance.tracker.has_changed(field) for field in fields):
+            return
+        TaskCounter.change(*[instance.tracker.previous(field) for field in fields], -1)
+
+    TaskCounter.change(instance.product_id, instance.initiative_id, instance.status, instance.blocked, 1)
+
+
+@receiver(post_delete, sender=Task)
+def uncount_task(sender, instance, **kwargs):
+    TaskCounter.change(instance.product_id, instance.initiative_id, instance.status, instance.blocked, -1)
+
+
 class ProductTask(TimeStampMixin, UUIDMixin):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     task = models.ForeignKey(Task, on_delete=models.CASCADE)
@@ -0,0 +1,316 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Prefetch, Q, Subquery
+
+from matching.models import TaskClaim, CLAIM_TYPE_DONE, CLAIM_TYPE_ACTIVE
+from work.models import Capability, CapabilityTreeVersion, Expertise, Task, TaskDepend, TaskListing, TaskListingQueue
+from work.utils import get_person_data, get_product_data, get_tree_breadcrumbs, to_dict
+
+
+def get_task_listing_queryset():
+    """Tasks with everything a TaskListing row needs, tags, depends and claims are computed in SQL"""
+    return Task.objects \
+        .select_related("created_by__user", "updated_by__user", "reviewer__user", "initiative", "capability",
+                        "category", "product__owner__organisation", "product__owner__person__user") \
+        .prefetch_related(Prefetch("expertise", queryset=Expertise.objects.order_by("id"))) \
+        .annotate(
+            tag_names=ArrayAgg("tag__name", filter=Q(tag__isnull=False), distinct=True),
+            active_depends=Exists(
+                TaskDepend.objects
+                .filter(task=OuterRef("pk"))
+                .exclude(depends_by__status=Task.TASK_STATUS_DONE)
+            ),
+            has_claim_in_review=Exists(TaskClaim.objects.filter(task=OuterRef("pk"), kind=CLAIM_TYPE_DONE)),
+            current_claim_id=Subquery(
+                TaskClaim.objects
+                .filter(task=OuterRef("pk"), kind__in=[CLAIM_TYPE_DONE, CLAIM_TYPE_ACTIVE])
+                .order_by("id")
+                .values("id")[:1]
+            ),
+        )
+
+
+def get_task_listing_data(task, task_claim):
+    """Build TaskListing fields from a task loaded with get_task_listing_queryset"""
+    product = task.product
+
+    return dict(
+        title=task.title,
+        description=task.description,
+        short_description=task.short_description,
+        status=task.status,
+        tags=task.tag_names or [],
+        blocked=task.blocked,
+        featured=task.featured,
+        priority=task.priority,
+        published_id=task.published_id,
+        auto_approve_task_claims=task.auto_approve_task_claims,
+        task_creator_id=task.created_by_id,
+        created_by=get_person_data(task.created_by) if task.created_by else None,
+        updated_by=get_person_data(task.updated_by) if task.updated_by else None,
+        reviewer=get_person_data(task.reviewer) if task.reviewer else None,
+        product_data=get_product_data(product) if product else None,
+        product_id=task.product_id,
+        is_private=product.is_private if product else False,
+        category_id=task.category_id,
+        category_name=task.category.name if task.category else None,
+        category_parent_id=task.category.parent_id if task.category else None,
+        expertise_data=[{"id": expertise.id, "name": expertise.name} for expertise in task.expertise.all()],
+        has_active_depends=task.active_depends,
+        initiative_id=task.initiative_id,
+        initiative_data=to_dict(task.initiative) if task.initiative else None,
+        capability_id=task.capability_id,
+        capability_data=to_dict(task.capability) if task.capability else None,
+        in_review=task.has_claim_in_review,
+        video_url=task.video_url,
+        task_claim=to_dict(task_claim) if task_claim else None,
+        assigned_to_data=get_person_data(task_claim.person) if task_claim and task_claim.person else None,
+        assigned_to_person_id=task_claim.person_id if task_claim else None,
+    )
+
+
+def write_task_listings(tasks):
+    """Create or update the TaskListing rows of already loaded tasks, returns the number of written rows"""
+    if not tasks:
+        return 0
+
+    task_ids = [task.id for task in tasks]
+    claim_ids = [task.current_claim_id for task in tasks if task.current_claim_id]
+    task_claims = TaskClaim.objects.select_related("person__user").in_bulk(claim_ids) if claim_ids else {}
+    listings = {listing.task_id: listing for listing in TaskListing.objects.filter(task_id__in=task_ids)}
+
+    new_listings = []
+    updated_listings = []
+    fields = None
+    for task in tasks:
+        data = get_task_listing_data(task, task_claims.get(task.current_claim_id))
+        fields = list(data.keys())
+        listing = listings.get(task.id)
+        if listing:
+            for field, value in data.items():
+                setattr(listing, field, value)
+            updated_listings.append(listing)
+        else:
+            new_listings.append(TaskListing(task_id=task.id, **data))
+
+    if new_listings:
+        TaskListing.objects.bulk_create(new_listings)
+    if updated_listings:
+        TaskListing.objects.bulk_update(updated_listings, fields)
+
+    return len(new_listings) + len(updated_listings)
+
+
+def rebuild_task_listings(task_ids):
+    """Rebuild the TaskListing rows of the given tasks with a fixed number of queries"""
+    task_ids = set(task_ids)
+    if not task_ids:
+        return 0
+
+    return write_task_listings(list(get_task_listing_queryset().filter(id__in=task_ids)))
+
+
+def rebuild_all_task_listings(product_id=None, chunk_size=500, start_after=0, on_chunk=None):
+    """Rebuild the listings of every task (or one product's tasks) in chunks ordered by task id.
+
+    Every chunk is committed on its own, on_chunk(last_task_id, written) is called after each commit
+    so callers can report progress and store a checkpoint to resume from with start_after.
+    """
+    tasks = get_task_listing_queryset().order_by("id")
+    if product_id:
+        tasks = tasks.filter(product_id=product_id)
+
+    written = 0
+    last_task_id = start_after
+    while True:
+        chunk = list(tasks.filter(id__gt=last_task_id)[:chunk_size])
+        if not chunk:
+            break
+
+        with transaction.atomic():
+            written += write_task_listings(chunk)
+        last_task_id = chunk[-1].id
+
+        if on_chunk:
+            on_chunk(last_task_id, written)
+
+    return written
+
+
+def process_task_listing_queue(batch_size=100):
+    """Rebuild listings for one batch of queued tasks, returns the number of tasks taken from the queue"""
+    with transaction.atomic():
+        task_ids = TaskListingQueue.pop(batch_size)
+        try:
+            with transaction.atomic():
+                rebuild_task_listings(task_ids)
+        except Exception as e:
+            # retry one by one so a single broken task doesn't block the whole queue
+            print("Failed to rebuild task listings batch:", e, flush=True)
+            for task_id in task_ids:
+                try:
+                    with transaction.atomic():
+                        rebuild_task_listings([task_id])
+                except Exception as e:
+                    print(f"Failed to rebuild task listing for task {task_id}:", e, flush=True)
+
+    return len(task_ids)
+
+
+def get_capability_tree_cache_key(product, kind):
+    return f"capability-tree:{kind}:{product.id}:{CapabilityTreeVersion.get_version(product)}"
+
+
+def get_capability_tree(product):
+    """Snapshot of the product's capability tree as dumped by Capability.dump_bulk, cached per tree version.
+
+    Returns a dict with the tree, the same tree serialized to JSON and the ETag of that JSON.
+    """
+    key = get_capability_tree_cache_key(product, "tree")
+    snapshot = cache.get(key)
+    if snapshot is None:
+        tree = Capability.dump_bulk(parent=Capability.objects.get(pk=product.capability_start_id))
+        tree_json = json.dumps(tree, cls=DjangoJSONEncoder)
+        snapshot = dict(
+            tree=tree,
+            json=tree_json,
+            etag=f'"{hashlib.md5(tree_json.encode()).hexdigest()}"',
+        )
+        cache.set(key, snapshot, settings.CAPABILITY_TREE_CACHE_TIMEOUT)
+
+    return snapshot
+
+
+def get_capability_list(product):
+    """Capabilities of the product without the root node in tree order, cached per tree version"""
+    key = get_capability_tree_cache_key(product, "list")
+    capabilities = cache.get(key)
+    if capabilities is None:
+        capabilities = list(Capability.get_tree(parent=Capability.objects.get(pk=product.capability_start_id))[1:])
+        cache.set(key, capabilities, settings.CAPABILITY_TREE_CACHE_TIMEOUT)
+
+    return capabilities
+
+
+def get_capability_breadcrumbs(capability):
+    """Ancestors of the capability below the product root with their siblings, cached per tree version"""
+    key = f"capability-crumbs:{capability.id}:{CapabilityTreeVersion.get_capability_version(capability)}"
+    crumbs = cache.get(key)
+    if crumbs is None:
+        crumbs = get_tree_breadcrumbs(capability)
+        cache.set(key, crumbs, settings.CAPABILITY_TREE_CACHE_TIMEOUT)
+
+    return crumbs
+
+
+def get_longest_increasing_subsequence(values):
+    """Indexes of one longest strictly increasing subsequence of values"""
+    tails = []  # index of the smallest tail of every subsequence length
+    previous = [None] * len(values)
+    for i, value in enumerate(values):
+        low, high = 0, len(tails)
+        while low < high:
+            middle = (low + high) // 2
+            if values[tails[middle]] < value:
+                low = middle + 1
+            else:
+                high = middle
+        previous[i] = tails[low - 1] if low else None
+        if low == len(tails):
+            tails.append(i)
+        else:
+            tails[low] = i
+
+    indexes = []
+    i = tails[-1] if tails else None
+    while i is not None:
+        indexes.append(i)
+        i = previous[i]
+    return set(indexes)
+
+
+def update_capability_tree(root, tree):
+    """Make the capability tree under root match tree with as few row changes as possible.
+
+    tree is a list of {"id", "data": {"name", "description", "video_link"}, "children"} items, the
+    format of Capability.load_bulk. Nodes that are only reordered keep their place when they already are
+    in the right relative order, others are moved with treebeard's move(). Unknown ids are created,
+    nodes missing from tree are kept. Returns the ids of the created, moved and updated nodes.
+    """
+    steplen = Capability.steplen
+    nodes = {node.id: node for node in root.get_descendants()}
+    ids_by_path = {node.path: node.id for node in nodes.values()}
+    ids_by_path[root.path] = root.id
+    current_parents = {node.id: ids_by_path[node.path[:-steplen]] for node in nodes.values()}
+    current_positions = {node.id: node.path for node in nodes.values()}
+
+    changes = dict(created=[], moved=[], updated=[])
+    seen = set()
+
+    def get_node(node_id):
+        # every move rewrites paths, so nodes are always read again before being used as a move target
+        return Capability.objects.get(pk=node_id)
+
+    def place(node, parent_id, previous_id):
+        if previous_id:
+            node.move(get_node(previous_id), "right")
+            return
+
+        first_child = get_node(parent_id).get_first_child()
+        if not first_child:
+            node.move(get_node(parent_id), "first-child")
+        elif first_child.id != node.id:
+            node.move(first_child, "left")
+
+    def update_children(items, parent_id):
+        items = [item for item in items if item.get("id") not in seen]
+        seen.update(item["id"] for item in items if item.get("id"))
+
+        # siblings already under this parent in the right relative order stay where they are
+        staying = [item["id"] for item in items if current_parents.get(item.get("id")) == parent_id]
+        kept = get_longest_increasing_subsequence([current_positions[node_id] for node_id in staying])
+        kept = {staying[i] for i in kept}
+
+        previous_id = None
+        for item in items:
+            node_id = item.get("id")
+            data = item.get("data", {})
+            if node_id not in nodes:
+                if previous_id:
+                    node = get_node(previous_id).add_sibling("right", **data)
+                else:
+                    parent = get_node(parent_id)
+                    first_child = parent.get_first_child()
+                    node = first_child.add_sibling("left", **data) if first_child else parent.add_child(**data)
+                node_id = node.id
+                changes["created"].append(node_id)
+            else:
+                if node_id not in kept:
+                    place(get_node(node_id), parent_id, previous_id)
+                    changes["moved"].append(node_id)
+
+                node = nodes[node_id]
+                changed_fields = [field for field, value in data.items() if getattr(node, field) != value]
+                if changed_fields:
+                    for field in changed_fields:
+                        setattr(node, field, data[field])
+                    # only the changed columns are written, the path of this instance may be outdated
+                    node.save(update_fields=changed_fields)
+                    changes["updated"].append(node_id)
+
+            update_children(item.get("children", []), node_id)
+            previous_id = node_id
+
+    with transaction.atomic():
+        update_children(tree, root.id)
+        if changes["moved"]:
+            # moves are raw updates without signals
+            CapabilityTreeVersion.bump(root)
+
+    return changes
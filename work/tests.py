@@ -1,3 +1,516 @@
-from django.test import TestCase
+import json
+import threading
+from collections import Counter
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection, transaction
+
+from backend.test_base import TestCase, TransactionTestCase
+from commercial.models import Organisation, ProductOwner
+from matching.models import CLAIM_TYPE_ACTIVE, CLAIM_TYPE_DONE, TaskClaim
+from talent.models import Person
+from users.models import User
+from work.models import (
+    Capability, CapabilityTreeVersion, Initiative, Product, Tag, Task, TaskCounter, TaskDepend, TaskListing, TaskListingQueue,
+    get_task_counts,
+)
+from work.services import (
+    process_task_listing_queue, rebuild_all_task_listings, rebuild_task_listings, update_capability_tree,
+)
+from work.utils import get_person_data, get_tree_breadcrumbs, to_dict
+
+
+class TaskListingIndexTest(TestCase):
+    """The filter shapes of TaskListing.get_filtered_data must be served by the listing indexes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        public_product = Product.objects.create(name="Public product", short_description="", website="")
+        private_product = Product.objects.create(name="Private product", short_description="", website="",
+                                                 is_private=True)
+
+        # bulk_create doesn't send post_save, so the listings are seeded directly
+        tasks = Task.objects.bulk_create([
+            Task(title=f"Task {i}", description="", short_description="", status=i % 6,
+                 product=private_product if i % 10 == 0 else public_product)
+            for i in range(3000)
+        ])
+        TaskListing.objects.bulk_create([
+            TaskListing(
+                task=task,
+                title=task.title,
+                description="",
+                short_description="",
+                status=task.status,
+                tags=[f"tag{task.id % 50}"],
+                priority=task.id % 3,
+                created_by={},
+                updated_by={},
+                product=task.product,
+                is_private=task.product.is_private,
+                has_active_depends=task.id % 7 == 0,
+            )
+            for task in tasks
+        ])
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE work_tasklisting")
+
+    def explain(self, queryset):
+        # the seeded table is small, so only check that the planner can use an index at all
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            return queryset.explain()
+
+    def test_public_available_board(self):
+        queryset = TaskListing.get_filtered_data(
+            {"statuses": [Task.TASK_STATUS_AVAILABLE]},
+            exclude_data={"status__in": [0, 1, 5]}
+        )
+        self.assertIn("tasklisting_public_status_idx", self.explain(queryset))
+
+    def test_public_statuses(self):
+        queryset = TaskListing.get_filtered_data(
+            {"statuses": [Task.TASK_STATUS_CLAIMED, Task.TASK_STATUS_DONE]},
+            exclude_data={"status__in": [0, 1, 5]}
+        )
+        self.assertIn("tasklisting_public_status_idx", self.explain(queryset))
+
+    def test_tags(self):
+        queryset = TaskListing.get_filtered_data({"tags": ["tag1"]})
+        self.assertIn("tasklisting_tags_gin_idx", self.explain(queryset))
+
+    def test_categories(self):
+        queryset = TaskListing.get_filtered_data({"categories": [1]})
+        self.assertIn("tasklisting_public_cat_idx", self.explain(queryset))
+
+    def test_no_product_join(self):
+        queryset = TaskListing.get_filtered_data({})
+        self.assertNotIn("work_product", str(queryset.query))
+
+    def test_no_task_join(self):
+        queryset = TaskListing.get_filtered_data({"categories": [1]})
+        sql = str(queryset.query)
+        self.assertNotIn("work_task\"", sql)
+        self.assertNotIn("DISTINCT", sql)
+
+
+class TreeBreadcrumbsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        root = Capability.add_root(name="Product")
+        cls.first = root.add_child(name="First")
+        cls.second = root.add_child(name="Second")
+        cls.first_child = Capability.objects.get(pk=cls.first.pk).add_child(name="First child")
+        cls.first_sibling = Capability.objects.get(pk=cls.first.pk).add_child(name="First sibling")
+        cls.leaf = Capability.objects.get(pk=cls.first_child.pk).add_child(name="Leaf")
+
+    def test_ancestors_with_siblings(self):
+        with self.assertNumQueries(1):
+            crumbs = get_tree_breadcrumbs(self.leaf)
+
+        self.assertEqual(crumbs, [
+            {"id": self.first.id, "name": "First", "siblings": [{"id": self.second.id, "name": "Second"}]},
+            {"id": self.first_child.id, "name": "First child",
+             "siblings": [{"id": self.first_sibling.id, "name": "First sibling"}]},
+        ])
+
+    def test_top_level_node(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(get_tree_breadcrumbs(self.first), [])
+
+
+def get_capability_tree(node):
+    return [
+        {
+            "id": child.id,
+            "data": {"name": child.name, "description": child.description, "video_link": child.video_link},
+            "children": get_capability_tree(child),
+        }
+        for child in Capability.objects.get(pk=node.pk).get_children()
+    ]
+
+
+class CapabilityTreeUpdateTest(TestCase):
+    def setUp(self):
+        self.root = Capability.add_root(name="Product")
+        self.product = Product.objects.create(name="product", short_description="", website="",
+                                              capability_start=self.root)
+        for name, children in [("A", ["A1", "A2", "A3"]), ("B", ["B1"]), ("C", [])]:
+            node = Capability.objects.get(pk=self.root.pk).add_child(name=name)
+            for child in children:
+                Capability.objects.get(pk=node.pk).add_child(name=child)
+
+        self.tree = get_capability_tree(self.root)
+        self.ids = {node.name: node.id for node in Capability.objects.all()}
+        self.version = CapabilityTreeVersion.get_version(self.product)
+
+    def update(self, tree):
+        changes = update_capability_tree(Capability.objects.get(pk=self.root.pk), tree)
+        self.assertEqual(get_capability_tree(self.root), tree)
+        # every node keeps its row and id
+        self.assertEqual(Capability.objects.filter(pk__in=self.ids.values()).count(), len(self.ids))
+        return changes
+
+    def assertVersionBumped(self, bumped=True):
+        self.assertEqual(CapabilityTreeVersion.get_version(self.product) > self.version, bumped)
+
+    def test_no_op(self):
+        paths = dict(Capability.objects.values_list("id", "path"))
+
+        self.assertEqual(self.update(self.tree), dict(created=[], moved=[], updated=[]))
+        self.assertEqual(dict(Capability.objects.values_list("id", "path")), paths)
+        self.assertVersionBumped(False)
+
+    def test_reorder(self):
+        a = self.tree[0]
+        a["children"] = [a["children"][1], a["children"][0], a["children"][2]]
+        self.tree = [self.tree[2], self.tree[0], self.tree[1]]
+
+        changes = self.update(self.tree)
+        # one move per level puts the siblings back in order
+        self.assertEqual(len(changes["moved"]), 2)
+        self.assertEqual(changes["created"], [])
+        self.assertEqual(changes["updated"], [])
+        self.assertVersionBumped()
+
+    def test_move_across_parents(self):
+        a3 = self.tree[0]["children"].pop()
+        self.tree[1]["children"].insert(0, a3)
+        a = self.tree.pop(0)
+        self.tree[1]["children"].append(a)
+
+        self.assertEqual(self.update(self.tree), dict(created=[], moved=[self.ids["A3"], self.ids["A"]], updated=[]))
+        self.assertEqual(Capability.objects.get(pk=self.ids["A1"]).get_parent().id, self.ids["A"])
+        self.assertVersionBumped()
+
+    def test_insert(self):
+        first = {"data": {"name": "B0", "description": "", "video_link": None}, "children": []}
+        last = {"data": {"name": "C1", "description": "", "video_link": None}, "children": []}
+        self.tree[1]["children"].insert(0, first)
+        self.tree[2]["children"].append(last)
+
+        changes = update_capability_tree(Capability.objects.get(pk=self.root.pk), self.tree)
+        self.assertEqual(len(changes["created"]), 2)
+        first["id"], last["id"] = changes["created"]
+        self.assertEqual(changes["moved"], [])
+        self.assertEqual(get_capability_tree(self.root), self.tree)
+
+    def test_rename(self):
+        self.tree[0]["children"][1]["data"].update(name="A2 renamed", description="Second")
+
+        self.assertEqual(self.update(self.tree), dict(created=[], moved=[], updated=[self.ids["A2"]]))
+
+    def test_delete(self):
+        # nodes left out of the tree are kept, they are deleted with their own mutation
+        a2 = self.tree[0]["children"].pop(1)
+        changes = update_capability_tree(Capability.objects.get(pk=self.root.pk), self.tree)
+        self.assertEqual(changes, dict(created=[], moved=[], updated=[]))
+        self.tree[0]["children"].insert(1, a2)
+        self.assertEqual(get_capability_tree(self.root), self.tree)
+
+        Capability.objects.get(pk=self.ids.pop("A2")).delete()
+        self.tree[0]["children"].pop(1)
+        self.assertEqual(self.update(self.tree), dict(created=[], moved=[], updated=[]))
+
+
+def create_person(username):
+    user = User.objects.create(username=username, email=f"{username}@example.com")
+    return Person.objects.create(first_name=username, slug=username, headline="", user=user)
+
+
+class TaskCounterTest(TestCase):
+    def setUp(self):
+        person = create_person("person")
+        self.products = [
+            Product.objects.create(name=f"product{i}", short_description="", website="") for i in range(2)
+        ]
+        self.initiative = Initiative.objects.create(name="Initiative", product=self.products[0])
+        self.tasks = [
+            Task.objects.create(title=f"Task {i}", description="", short_description="", status=i % 6,
+                                blocked=i % 5 == 0, product=self.products[i % 2],
+                                initiative=self.initiative if i % 3 == 0 else None,
+                                created_by=person, updated_by=person)
+            for i in range(24)
+        ]
+
+    def assertCounted(self):
+        for scope, lookup in [(product, "product") for product in self.products] + [(self.initiative, "initiative")]:
+            expected = Counter()
+            for status, blocked in Task.objects.filter(**{lookup: scope}).values_list("status", "blocked"):
+                expected[(status, False)] += 1
+                expected[(status, True)] += blocked
+
+            counts = {
+                status: counts for status, counts in get_task_counts(scope).items() if counts != (0, 0)
+            }
+            self.assertEqual(counts, {
+                status: (expected[(status, False)], expected[(status, True)])
+                for status, _ in Task.TASK_STATUS if expected[(status, False)]
+            })
+
+    def test_signals(self):
+        self.assertCounted()
+
+        task = self.tasks[1]
+        task.status = Task.TASK_STATUS_DONE
+        task.blocked = True
+        task.product = self.products[0]
+        task.initiative = self.initiative
+        task.save()
+        self.tasks[3].delete()
+        # saves without counted changes don't touch the counters
+        task = Task.objects.get(pk=self.tasks[4].pk)
+        with self.assertNumQueries(1):
+            task.save(update_fields=["title"])
+
+        self.assertCounted()
+
+    def test_reconcile(self):
+        TaskCounter.objects.filter(status=Task.TASK_STATUS_AVAILABLE).delete()
+        TaskCounter.objects.update(count=100)
+
+        self.assertEqual(TaskCounter.reconcile(), TaskCounter.objects.count())
+        self.assertCounted()
+
+    def test_product_task_nums(self):
+        # tasks count by Task.product like on the task board, also the ones without an initiative
+        query = '{ product(slug: "product0") { availableTaskNum totalTaskNum } }'
+        response = self.client.post("/graphql", json.dumps({"query": query}), content_type="application/json")
+
+        tasks = self.tasks[::2]
+        self.assertEqual(response.json()["data"]["product"], {
+            "availableTaskNum": len([task for task in tasks if task.status == Task.TASK_STATUS_AVAILABLE]),
+            "totalTaskNum": len(tasks),
+        })
+        self.assertFalse(any(task.initiative for task in tasks if task.status == Task.TASK_STATUS_AVAILABLE))
+
+
+class TaskListingCountTest(TestCase):
+    """tasklistingByProductCount must match the length of tasklistingByProduct"""
+
+    def setUp(self):
+        self.person = create_person("person")
+        owner = ProductOwner.objects.create(person=self.person)
+        products = [
+            Product.objects.create(name="Public", short_description="", website="", owner=owner),
+            Product.objects.create(name="Private", short_description="", website="", owner=owner, is_private=True),
+        ]
+        for product in products:
+            tasks = [
+                Task.objects.create(title=f"Task {i}", description="", short_description="", status=i % 6,
+                                    blocked=i % 7 == 0, product=product,
+                                    created_by=self.person, updated_by=self.person)
+                for i in range(30)
+            ]
+            # available tasks depending on tasks which aren't done have active depends
+            for i in range(2, 27, 9):
+                TaskDepend.objects.create(task=tasks[i], depends_by=tasks[i + 1])
+                TaskDepend.objects.create(task=tasks[i + 1], depends_by=tasks[i])
+        rebuild_all_task_listings()
+
+    def get_listing(self, product_slug, statuses):
+        query = """
+            query Listing($productSlug: String, $input: TaskListInput) {
+                tasklistingByProduct(productSlug: $productSlug, input: $input) { id }
+                tasklistingByProductCount(productSlug: $productSlug, input: $input)
+            }
+        """
+        variables = {"productSlug": product_slug, "input": {"statuses": statuses}}
+        response = self.client.post("/graphql", json.dumps({"query": query, "variables": variables}),
+                                    content_type="application/json")
+        data = response.json()["data"]
+        return len(data["tasklistingByProduct"]), data["tasklistingByProductCount"]
+
+    def test_count(self):
+        for logged_in in (False, True):
+            if logged_in:
+                self.client.force_login(self.person.user)
+            for product_slug in ("public", "private"):
+                for statuses in ([], [2], [3], [2, 3], [0, 1, 4, 5]):
+                    with self.subTest(logged_in=logged_in, product_slug=product_slug, statuses=statuses):
+                        length, count = self.get_listing(product_slug, statuses)
+                        self.assertEqual(count, length)
+                        if product_slug == "public" and statuses in ([], [3]):
+                            self.assertGreater(count, 0)
+
+
+def get_expected_listing(task):
+    """The listing fields of a task as the former per-row save_task_listing signal built them"""
+    task_claim = task.taskclaim_set.filter(kind__in=[CLAIM_TYPE_DONE, CLAIM_TYPE_ACTIVE]).order_by("id").first()
+    product = task.product
+    return dict(
+        title=task.title,
+        description=task.description,
+        short_description=task.short_description,
+        status=task.status,
+        tags=sorted(task.tag.values_list("name", flat=True)),
+        blocked=task.blocked,
+        featured=task.featured,
+        priority=task.priority,
+        published_id=task.published_id,
+        auto_approve_task_claims=task.auto_approve_task_claims,
+        task_creator_id=task.created_by_id,
+        created_by=get_person_data(task.created_by),
+        updated_by=get_person_data(task.updated_by),
+        reviewer=get_person_data(task.reviewer) if task.reviewer else None,
+        product_data={
+            "name": product.name,
+            "slug": product.slug,
+            "owner": product.get_product_owner().username,
+            "website": product.website,
+            "detail_url": product.detail_url,
+            "video_url": product.video_url
+        } if product else None,
+        product_id=task.product_id,
+        has_active_depends=Task.objects.filter(taskdepend__task=task.id).exclude(
+            status=Task.TASK_STATUS_DONE).exists(),
+        initiative_id=task.initiative_id,
+        initiative_data=to_dict(task.initiative) if task.initiative else None,
+        capability_id=task.capability_id,
+        capability_data=to_dict(task.capability) if task.capability else None,
+        in_review=task.taskclaim_set.filter(kind=CLAIM_TYPE_DONE).exists(),
+        video_url=task.video_url,
+        task_claim=to_dict(task_claim) if task_claim else None,
+        assigned_to_data=get_person_data(task_claim.person) if task_claim else None,
+        assigned_to_person_id=task_claim.person_id if task_claim else None,
+    )
+
+
+def get_listings():
+    return {listing["task_id"]: dict(listing, tags=sorted(listing["tags"])) for listing in TaskListing.objects.values()}
+
+
+class TaskListingQueueTest(TestCase):
+    def setUp(self):
+        self.persons = [create_person(f"person{i}") for i in range(3)]
+        self.organisation = Organisation.objects.create(username="organisation", name="Organisation")
+        products = [
+            Product.objects.create(name="product0", short_description="", website="",
+                                   owner=ProductOwner.objects.create(person=self.persons[0])),
+            Product.objects.create(name="product1", short_description="", website="",
+                                   owner=ProductOwner.objects.create(organisation=self.organisation)),
+        ]
+        initiative = Initiative.objects.create(name="Initiative", product=products[0])
+        capability = Capability.add_root(name="Capability")
+        tags = [Tag.objects.create(name=f"tag{i}") for i in range(3)]
+
+        self.tasks = []
+        for i in range(8):
+            task = Task.objects.create(
+                title=f"Task {i}", description="", short_description="", status=i % 6, priority=i % 3,
+                product=products[i % 2], initiative=initiative if i % 2 == 0 else None,
+                capability=capability if i % 3 == 0 else None, created_by=self.persons[i % 3],
+                updated_by=self.persons[(i + 1) % 3], reviewer=self.persons[2] if i % 4 == 1 else None,
+            )
+            task.tag.add(*tags[:i % 4])
+            if i % 3 == 1:
+                TaskClaim.objects.create(task=task, person=self.persons[i % 3], kind=i % 2)
+            if i > 1 and i % 2 == 0:
+                TaskDepend.objects.create(task=task, depends_by=self.tasks[i - 1])
+            self.tasks.append(task)
+        TaskListingQueue.objects.all().delete()
+
+    def test_rebuild_matches_per_row_build(self):
+        # chunks smaller than the tasks, the rebuild must be resumable per chunk
+        chunks = []
+        written = rebuild_all_task_listings(chunk_size=3, on_chunk=lambda *args: chunks.append(args))
+
+        self.assertEqual(written, len(self.tasks))
+        self.assertEqual([written for _, written in chunks], [3, 6, 8])
+        listings = get_listings()
+        for task in Task.objects.all():
+            listing = listings[task.id]
+            expected = get_expected_listing(task)
+            self.assertEqual({field: listing[field] for field in expected}, expected)
+
+        # a rebuild of existing rows updates them and keeps the output
+        rebuild_all_task_listings(chunk_size=3, start_after=chunks[0][0])
+        self.assertEqual(get_listings(), listings)
+
+    def test_rebuild_queries(self):
+        rebuild_all_task_listings()
+        # the number of queries doesn't grow with the number of tasks
+        with self.assertNumQueries(5):
+            rebuild_task_listings([self.tasks[1].id])
+        with self.assertNumQueries(5):
+            rebuild_task_listings([task.id for task in self.tasks])
+
+    def test_person_and_owner_refresh(self):
+        rebuild_all_task_listings()
+
+        self.persons[0].first_name = "Renamed"
+        self.persons[0].save()
+        user = self.persons[1].user
+        user.username = "renamed"
+        user.save()
+        self.organisation.username = "renamedorganisation"
+        self.organisation.save()
+        owner = ProductOwner.objects.get(person=self.persons[0])
+        owner.person = self.persons[2]
+        owner.save()
+
+        listings = get_listings()
+        self.assertIn({"first_name": "Renamed", "username": "person0"},
+                      [listing["created_by"] for listing in listings.values()])
+        # the JSON updated in place equals a full rebuild
+        rebuild_all_task_listings()
+        self.assertEqual(listings, get_listings())
+
+    def test_enqueue_coalesces(self):
+        first, second, deleted = self.tasks[:3]
+        deleted_id = deleted.id
+        deleted.delete()
+
+        TaskListingQueue.enqueue([first.id, first.id, second.id])
+        TaskListingQueue.enqueue([first.id, deleted_id])
+
+        self.assertEqual(sorted(TaskListingQueue.objects.values_list("task_id", flat=True)),
+                         [first.id, second.id])
+
+    def test_process_queue_falls_back_per_task(self):
+        # a product without an owner can't be listed, the other tasks of the batch are still rebuilt
+        broken = self.tasks[1]
+        Product.objects.filter(pk=broken.product_id).update(owner=None)
+        task_ids = [task.id for task in self.tasks[:4]]
+        TaskListingQueue.enqueue(task_ids)
+
+        with mock.patch("builtins.print"):
+            self.assertEqual(process_task_listing_queue(batch_size=10), 4)
+
+        self.assertFalse(TaskListingQueue.objects.exists())
+        listed = set(TaskListing.objects.values_list("task_id", flat=True))
+        self.assertEqual(listed, {self.tasks[0].id, self.tasks[2].id})
+
+
+class TaskListingQueueLockTest(TransactionTestCase):
+    def test_pop_skips_locked_rows(self):
+        person = create_person("person")
+        task_ids = [
+            Task.objects.create(title=f"Task {i}", description="", short_description="", created_by=person,
+                                updated_by=person).id
+            for i in range(5)
+        ]
+        TaskListingQueue.objects.all().delete()
+        TaskListingQueue.enqueue(task_ids)
+
+        popped = []
+
+        def pop():
+            try:
+                with transaction.atomic():
+                    popped.extend(TaskListingQueue.pop(10))
+            finally:
+                connection.close()
+
+        with transaction.atomic():
+            first = TaskListingQueue.pop(2)
+            # another worker takes the rest of the queue without waiting for this transaction
+            thread = threading.Thread(target=pop)
+            thread.start()
+            thread.join(10)
+            self.assertFalse(thread.is_alive())
+
+        self.assertEqual(len(first), 2)
+        self.assertEqual(sorted(first + popped), sorted(task_ids))
+        self.assertFalse(TaskListingQueue.objects.exists())
@@ -1,5 +1,8 @@
+import json
 import uuid
 
+from django.db.models import Func, JSONField, Q, Value
+from django.db.models.functions import Cast
 from django.forms.models import model_to_dict
 
 
@@ -7,6 +10,58 @@ def get_person_data(person):
     return {"first_name": person.first_name, "username": person.user.username}
 
 
+def get_product_data(product):
+    return {
+        "name": product.name,
+        "slug": product.slug,
+        "owner": product.get_product_owner().username,
+        "website": product.website,
+        "detail_url": product.detail_url,
+        "video_url": product.video_url
+    }
+
+
 def to_dict(instance):
     result = model_to_dict(instance)
     return {key: str(result[key]) if isinstance(result[key], uuid.UUID) else result[key] for key in result.keys()}
+
+
+class JSONBSet(Func):
+    """Replace one top level key of a JSON column in place: jsonb_set(column, '{key}', value)"""
+    function = "jsonb_set"
+
+    def __init__(self, expression, key, value, **extra):
+        super().__init__(
+            expression,
+            Value(f"{{{key}}}"),
+            Cast(Value(json.dumps(value)), JSONField()),
+            output_field=JSONField(),
+            **extra
+        )
+
+
+def get_tree_breadcrumbs(node, skip=1, name_field="name"):
+    """Ancestors of a treebeard MP_Node with their siblings in one query, the top skip levels are left out.
+
+    Siblings of the ancestor at a depth are the nodes of that depth sharing the path of its parent,
+    so every level is one path prefix condition.
+    """
+    steplen = node.steplen
+    conditions = Q()
+    for depth in range(skip + 1, node.depth):
+        conditions |= Q(depth=depth, path__startswith=node.path[:steplen * (depth - 1)])
+    if not conditions:
+        return []
+
+    crumbs = {}
+    siblings = []
+    for tree_node in type(node).objects.filter(conditions).order_by("path").values("id", "path", "depth", name_field):
+        if node.path.startswith(tree_node["path"]):
+            crumbs[tree_node["depth"]] = {"id": tree_node["id"], "name": tree_node[name_field], "siblings": []}
+        else:
+            siblings.append(tree_node)
+
+    for sibling in siblings:
+        crumbs[sibling["depth"]]["siblings"].append({"id": sibling["id"], "name": sibling[name_field]})
+
+    return [crumbs[depth] for depth in sorted(crumbs)]
@@ -1,3 +1,31 @@
-from django.shortcuts import render
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control
 
-# Create your views here.
+from talent.models import Person
+from work.models import Product
+from work.services import get_capability_tree
+
+
+def get_capability_tree_json(request, product_slug):
+    """The product's capability tree as pre-serialized JSON, clients revalidate it with If-None-Match"""
+    product = get_object_or_404(Product, slug=product_slug)
+    if not product.capability_start_id:
+        raise Http404
+
+    if product.is_private:
+        person = Person.objects.filter(user_id=request.user.id).first() if request.user.is_authenticated else None
+        if not person or not product.is_product_member(person):
+            raise Http404
+
+    snapshot = get_capability_tree(product)
+    if request.headers.get("If-None-Match") == snapshot["etag"]:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(snapshot["json"], content_type="application/json")
+
+    response["ETag"] = snapshot["etag"]
+    patch_cache_control(response, no_cache=True)
+    if product.is_private:
+        patch_cache_control(response, private=True)
+    return response